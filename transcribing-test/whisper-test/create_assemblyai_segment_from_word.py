@@ -68,7 +68,7 @@ def create_natural_segments_from_words(words, target_length=30):
         'end': words[0]['end']
     }
     
-    for word in words:
+    for word_idx, word in enumerate(words):
         # 添加當前詞彙到段落
         current_segment['text'] += word['text']
         current_segment['end'] = word['end']
@@ -93,7 +93,6 @@ def create_natural_segments_from_words(words, target_length=30):
             segments.append(current_segment.copy())
             
             # 開始新段落
-            word_idx = words.index(word)
             if word_idx < len(words) - 1:
                 next_word = words[word_idx + 1]
                 current_segment = {
@@ -0,0 +1,9 @@
+"""
+語音轉文字處理管線
+把各測試腳本重複實作的轉錄、分段、評估邏輯集中成可重用的模組
+"""
+
+from .cues import Cue
+from .engine import TranscriptionEngine, TranscriptionError, get_engine, transcribe
+from .timeline import WordTimeline, from_provider
+from .segment_dp import SegmentParams, segment_dp
@@ -0,0 +1,351 @@
+"""
+CER / WER 評估
+fair_comparison_test、precise_word_level_test 只檢查寫死的詞（台積電 / 台积电、NVIDIA / 輝達）
+有沒有出現；這裡改為與參考逐字稿比對，計算字元錯誤率（CER）與詞錯誤率（WER）。
+
+- 編輯距離：Myers / Hyyrö 位元平行演算法，以 Python 大整數當位元向量，
+  每讀一個字元只做常數次整數運算，一小時逐字稿（約兩萬字）的精確距離在百毫秒內算完
+- 對齊：先找兩邊都只出現一次的 k-gram 當錨點，取最長遞增子序列（patience），
+  錨點之間的小區段再以縮小的 k 遞迴，最後用位元平行 DP 回溯，輸出 difflib 風格的
+  (tag, i1, i2, j1, j2) 操作供逐句檢查
+- 比對前以 textnorm.normalize_text 統一繁簡、全形半形、標點與大小寫
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .textnorm import normalize_text
+
+ANCHOR_SIZE = 8          # 字元對齊的初始錨點長度；詞對齊用一半
+DIRECT_DP_CELLS = 4096   # 區段小於此格數就直接 DP，不再找錨點
+
+# 中日韓文字逐字成詞，其餘連續的非空白字元為一個詞
+_CJK = "⺀-⿿぀-ヿ㐀-䶿一-鿿가-힯豈-﫿"
+TOKEN_PATTERN = re.compile(f"[{_CJK}]|[^\\s{_CJK}]+")
+
+
+@dataclass
+class ErrorRate:
+    """
+    評估結果
+    distance 為精確的編輯距離；替換 / 刪除 / 插入次數由 ops 統計，
+    錨點對齊在極少數情況下不是最佳路徑，三者相加可能略大於 distance
+    """
+    distance: int
+    reference_length: int
+    hypothesis_length: int
+    substitutions: int = 0
+    deletions: int = 0
+    insertions: int = 0
+    ops: list = field(default_factory=list)
+    reference: object = None
+    hypothesis: object = None
+
+    @property
+    def rate(self):
+        if not self.reference_length:
+            return 0.0 if not self.hypothesis_length else 1.0
+        return self.distance / self.reference_length
+
+    @property
+    def hits(self):
+        return self.reference_length - self.substitutions - self.deletions
+
+    def errors(self, context=0):
+        """
+        列出非 equal 的操作：(tag, 參考片段, 轉錄片段)
+        context > 0 時前後各多帶 context 個單位，方便閱讀
+        """
+        ref, hyp = self.reference, self.hypothesis
+        joiner = "" if isinstance(ref, str) else " "
+        result = []
+        for tag, i1, i2, j1, j2 in self.ops:
+            if tag == "equal":
+                continue
+            a1, b1 = max(i1 - context, 0), max(j1 - context, 0)
+            result.append((tag, joiner.join(ref[a1:i2 + context]), joiner.join(hyp[b1:j2 + context])))
+        return result
+
+    def to_dict(self):
+        return {
+            "rate": round(self.rate, 4),
+            "distance": self.distance,
+            "reference_length": self.reference_length,
+            "hypothesis_length": self.hypothesis_length,
+            "substitutions": self.substitutions,
+            "deletions": self.deletions,
+            "insertions": self.insertions,
+        }
+
+
+def _trim(a, b):
+    """共同前綴與後綴長度"""
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _match_masks(pattern):
+    """每個符號在 pattern 中出現位置的位元遮罩"""
+    masks = {}
+    bit = 1
+    for symbol in pattern:
+        masks[symbol] = masks.get(symbol, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def levenshtein(a, b):
+    """
+    精確編輯距離（替換、刪除、插入代價皆為 1）
+    a、b 為字串或詞的序列；較長的一方當位元向量，迴圈次數取較短的一方
+    """
+    prefix, suffix = _trim(a, b)
+    a = a[prefix:len(a) - suffix]
+    b = b[prefix:len(b) - suffix]
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(a)
+    if not b:
+        return m
+
+    masks = _match_masks(a)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv = mask, 0
+    score = m
+    for symbol in b:
+        eq = masks.get(symbol, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def _dp_ops(a, b, a0, b0, emit):
+    """
+    位元平行 DP 並保留每一欄的垂直差向量，再從右下角回溯
+    D(i, j) = j + popcount(Pv_j 低 i 位) - popcount(Mv_j 低 i 位)
+    """
+    m, n = len(a), len(b)
+    masks = _match_masks(a)
+    mask = (1 << m) - 1
+    pv, mv = mask, 0
+    columns = [(pv, mv)]
+    for symbol in b:
+        eq = masks.get(symbol, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = (mv | (~(xh | pv) & mask)) << 1 | 1
+        mh = (pv & xh) << 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+        columns.append((pv, mv))
+
+    def cost(i, j):
+        low = (1 << i) - 1
+        column_pv, column_mv = columns[j]
+        return j + (column_pv & low).bit_count() - (column_mv & low).bit_count()
+
+    steps = []
+    i, j = m, n
+    current = cost(i, j)
+    while i or j:
+        if i and j:
+            diagonal = cost(i - 1, j - 1)
+            if a[i - 1] == b[j - 1]:
+                steps.append("equal")
+                i, j, current = i - 1, j - 1, diagonal
+                continue
+            if diagonal + 1 == current:
+                steps.append("replace")
+                i, j, current = i - 1, j - 1, diagonal
+                continue
+        if i and (not j or cost(i - 1, j) + 1 == current):
+            steps.append("delete")
+            i, current = i - 1, current - 1
+        else:
+            steps.append("insert")
+            j, current = j - 1, current - 1
+
+    i, j = a0, b0
+    for tag in reversed(steps):
+        di = tag != "insert"
+        dj = tag != "delete"
+        emit(tag, i, i + di, j, j + dj)
+        i += di
+        j += dj
+
+
+def _anchors(a, a0, a1, b, b0, b1, k):
+    """兩邊區段內都只出現一次的 k-gram，依 a 的位置排序後取 b 位置的最長遞增子序列"""
+    counts_a = Counter(a[i:i + k] for i in range(a0, a1 - k + 1))
+    counts_b = Counter(b[j:j + k] for j in range(b0, b1 - k + 1))
+    positions = {}
+    for j in range(b0, b1 - k + 1):
+        gram = b[j:j + k]
+        if counts_b[gram] == 1 and counts_a.get(gram) == 1:
+            positions[gram] = j
+    pairs = []
+    for i in range(a0, a1 - k + 1):
+        j = positions.get(a[i:i + k])
+        if j is not None:
+            pairs.append((i, j))
+    if not pairs:
+        return []
+
+    # patience：tails[x] 為長度 x+1 的遞增序列目前最小的結尾
+    tails, tail_index, previous = [], [], [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        slot = bisect_left(tails, j)
+        if slot == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[slot] = j
+            tail_index[slot] = index
+        previous[index] = tail_index[slot - 1] if slot else None
+    chain = []
+    index = tail_index[-1]
+    while index is not None:
+        chain.append(pairs[index])
+        index = previous[index]
+    chain.reverse()
+
+    # 去掉彼此重疊的錨點
+    result = []
+    last_i = last_j = -k
+    for i, j in chain:
+        if i >= last_i + k and j >= last_j + k:
+            result.append((i, j))
+            last_i, last_j = i, j
+    return result
+
+
+def align(a, b, anchor_size=ANCHOR_SIZE):
+    """
+    對齊兩個序列，回傳 difflib 風格的 opcodes：[(tag, i1, i2, j1, j2), ...]
+    tag 為 equal / replace / delete / insert，相鄰同類操作已合併
+    """
+    if not isinstance(a, str):
+        a, b = tuple(a), tuple(b)
+    ops = []
+
+    def emit(tag, i1, i2, j1, j2):
+        if i1 == i2 and j1 == j2:
+            return
+        if ops and ops[-1][0] == tag and ops[-1][2] == i1 and ops[-1][4] == j1:
+            ops[-1] = (tag, ops[-1][1], i2, ops[-1][3], j2)
+        else:
+            ops.append((tag, i1, i2, j1, j2))
+
+    # 以堆疊代替遞迴；("emit", ...) 直接輸出，("span", ...) 為待對齊的區段
+    stack = [("span", 0, len(a), 0, len(b), anchor_size)]
+    while stack:
+        task = stack.pop()
+        if task[0] == "emit":
+            emit(*task[1:])
+            continue
+        _, a0, a1, b0, b1, k = task
+        prefix, suffix = _trim(a[a0:a1], b[b0:b1])
+        emit("equal", a0, a0 + prefix, b0, b0 + prefix)
+        tail = ("emit", "equal", a1 - suffix, a1, b1 - suffix, b1)
+        a0, b0, a1, b1 = a0 + prefix, b0 + prefix, a1 - suffix, b1 - suffix
+        if a0 == a1 or b0 == b1:
+            emit("delete", a0, a1, b0, b0)
+            emit("insert", a1, a1, b0, b1)
+            emit(*tail[1:])
+            continue
+        if (a1 - a0) * (b1 - b0) <= DIRECT_DP_CELLS:
+            _dp_ops(a[a0:a1], b[b0:b1], a0, b0, emit)
+            emit(*tail[1:])
+            continue
+
+        anchors = _anchors(a, a0, a1, b, b0, b1, k)
+        if not anchors:
+            if k > 1:
+                stack.append(tail)
+                stack.append(("span", a0, a1, b0, b1, k // 2))
+            else:
+                _dp_ops(a[a0:a1], b[b0:b1], a0, b0, emit)
+                emit(*tail[1:])
+            continue
+
+        # 由後往前推入堆疊，彈出時就是由前往後的順序
+        stack.append(tail)
+        next_i, next_j = a1, b1
+        for i, j in reversed(anchors):
+            stack.append(("span", i + k, next_i, j + k, next_j, k))
+            stack.append(("emit", "equal", i, i + k, j, j + k))
+            next_i, next_j = i, j
+        stack.append(("span", a0, next_i, b0, next_j, k))
+    return ops
+
+
+def error_rate(reference, hypothesis, with_ops=True, anchor_size=ANCHOR_SIZE):
+    """對任意兩個序列（字串或詞清單）計算錯誤率"""
+    if not isinstance(reference, str):
+        reference, hypothesis = list(reference), list(hypothesis)
+    result = ErrorRate(
+        distance=levenshtein(reference, hypothesis),
+        reference_length=len(reference),
+        hypothesis_length=len(hypothesis),
+        reference=reference,
+        hypothesis=hypothesis,
+    )
+    if not with_ops:
+        return result
+    result.ops = align(reference, hypothesis, anchor_size)
+    for tag, i1, i2, j1, j2 in result.ops:
+        if tag == "replace":
+            result.substitutions += i2 - i1
+        elif tag == "delete":
+            result.deletions += i2 - i1
+        elif tag == "insert":
+            result.insertions += j2 - j1
+    return result
+
+
+def tokenize_words(text):
+    """WER 分詞：中日韓文字逐字、拉丁字母與數字以連續字元為一詞"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def cer(reference, hypothesis, normalize=True, ignore_punctuation=True, ignore_whitespace=True,
+        with_ops=True):
+    """
+    字元錯誤率；預設正規化繁簡與全形半形並忽略標點、空白
+    （AssemblyAI 的中文輸出沒有標點，ElevenLabs 有）
+    """
+    if normalize:
+        reference = normalize_text(reference, ignore_punctuation=ignore_punctuation,
+                                   ignore_whitespace=ignore_whitespace)
+        hypothesis = normalize_text(hypothesis, ignore_punctuation=ignore_punctuation,
+                                    ignore_whitespace=ignore_whitespace)
+    return error_rate(reference, hypothesis, with_ops)
+
+
+def wer(reference, hypothesis, normalize=True, ignore_punctuation=True, with_ops=True):
+    """詞錯誤率；中英混雜的逐字稿中文逐字計、英文與數字以詞計"""
+    if normalize:
+        reference = normalize_text(reference, ignore_punctuation=ignore_punctuation)
+        hypothesis = normalize_text(hypothesis, ignore_punctuation=ignore_punctuation)
+    return error_rate(tokenize_words(reference), tokenize_words(hypothesis), with_ops,
+                      max(ANCHOR_SIZE // 2, 1))
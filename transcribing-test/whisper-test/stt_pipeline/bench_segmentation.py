@@ -0,0 +1,120 @@
+"""
+斷句效能與品質比較：動態規劃 vs 貪婪
+以錄製的 ElevenLabs / AssemblyAI 結果重複拼接成數小時長的時間軸，
+比較耗時、段落數、孤兒段落、在標點處斷句的比例
+"""
+
+import argparse
+import json
+import time
+
+from .replay_server import FIXTURES_DIR
+from .segment_dp import CLAUSE_END, SENTENCE_END, SegmentParams, segment_dp, segment_greedy
+from .timeline import WordTimeline, from_provider
+from .width import display_width
+
+DEFAULT_SOURCES = {
+    "elevenlabs": "elevenlabs_scribe_v1_result.json",
+    "assemblyai": "assemblyai_chinese_result.json",
+}
+
+SEGMENTERS = {
+    "greedy": segment_greedy,
+    "dp": segment_dp,
+}
+
+ORPHAN_LENGTH = 5
+
+
+def repeat_timeline(timeline, target_seconds):
+    """把時間軸重複拼接到至少 target_seconds 長，時間依序往後平移"""
+    span = (timeline.ends[-1] if len(timeline) else 0) + 1000
+    repeats = max(int(target_seconds * 1000 // span) + 1, 1)
+    repeated = WordTimeline()
+    for r in range(repeats):
+        shift = r * span
+        for i in range(len(timeline)):
+            repeated.append(
+                timeline.text(i), timeline.starts[i] + shift, timeline.ends[i] + shift,
+                timeline.kinds[i], timeline.speaker(i), timeline.confidence[i],
+            )
+    return repeated.finalize()
+
+
+def cue_stats(cues, params):
+    lengths = [len(cue.text.strip()) for cue in cues]
+    widths = [display_width(cue.text.strip()) for cue in cues]
+    measured = widths if params.max_width else lengths
+    total = len(cues) or 1
+    target = params.target_length(sum(widths) / (sum(lengths) or 1))
+    punctuated = sum(1 for cue in cues if cue.text.rstrip()[-1:] in SENTENCE_END | CLAUSE_END)
+    return {
+        "cues": len(cues),
+        "orphans": sum(1 for length in lengths if length < ORPHAN_LENGTH),
+        "punctuation_breaks": punctuated / total,
+        "mean_deviation": sum(abs(length - target) for length in measured) / total,
+        "max_length": max(lengths, default=0),
+        "max_width": max(widths, default=0),
+    }
+
+
+def run_benchmark(timeline, params=None, repeat=3):
+    """回傳 {名稱: {seconds, cues, orphans, ...}}，seconds 取 repeat 次中最快的一次"""
+    params = params or SegmentParams()
+    results = {}
+    for name, segmenter in SEGMENTERS.items():
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cues = segmenter(timeline, params)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {"seconds": best, **cue_stats(cues, params)}
+    return results
+
+
+def format_results(label, word_count, results):
+    lines = [
+        f"\n📊 {label}（{word_count:,} 個項目）",
+        f"{'方法':<8} {'耗時(ms)':>10} {'段落數':>8} {'孤兒段':>8} {'標點斷句':>10} {'平均偏差':>10} {'最長':>6} {'最寬':>6}",
+    ]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<8} {r['seconds'] * 1000:>10.1f} {r['cues']:>8} {r['orphans']:>8} "
+            f"{r['punctuation_breaks']:>10.1%} {r['mean_deviation']:>10.2f} {r['max_length']:>6} {r['max_width']:>6}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較動態規劃與貪婪斷句")
+    parser.add_argument("--hours", type=float, default=2.0, help="拼接後的時間軸長度（小時）")
+    parser.add_argument("--max-chars", type=int, default=None,
+                        help="字數上限（未指定時：有 --max-width 則只限寬度，否則 18）")
+    parser.add_argument("--max-width", type=int, default=0, help="顯示寬度上限（0 代表不限制）")
+    parser.add_argument("--max-duration", type=float, default=5.0, help="每段最長秒數")
+    args = parser.parse_args()
+
+    params = SegmentParams(
+        max_chars=args.max_chars,
+        max_width=args.max_width,
+        max_duration_ms=int(args.max_duration * 1000),
+    )
+    for provider, filename in DEFAULT_SOURCES.items():
+        path = FIXTURES_DIR / filename
+        if not path.exists():
+            print(f"⚠️ 找不到 {filename}，略過")
+            continue
+        result = json.loads(path.read_text(encoding="utf-8"))
+        timeline = from_provider(provider, result)
+
+        print(format_results(f"{provider} 原始長度", len(timeline), run_benchmark(timeline, params)))
+        long_timeline = repeat_timeline(timeline, args.hours * 3600)
+        print(format_results(
+            f"{provider} 拼接 {args.hours:g} 小時", len(long_timeline),
+            run_benchmark(long_timeline, params, repeat=1),
+        ))
+
+
+if __name__ == "__main__":
+    main()
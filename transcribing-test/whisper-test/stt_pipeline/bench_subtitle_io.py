@@ -0,0 +1,88 @@
+"""
+字幕讀寫效能測試
+產生 100k 段的 SRT / WebVTT / ASS（單行與兩行文字各一組），比較 subtitle_io 的逐塊解析與舊腳本逐行解析的耗時
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from .cues import Cue
+from .subtitle_io import FORMATS, iter_cues, write_cues
+
+SAMPLE_TEXTS = [
+    "美国白宫直接把进口中国商品的关税",
+    "连台积电、联电、日月光都跌",
+    "NVIDIA 財報公布後股價大漲",
+    "降息想都別想，先觀望吧。",
+]
+
+
+def synthetic_cues(count, seed=0, lines=1):
+    """lines 為每段文字行數"""
+    rng = random.Random(seed)
+    cues = []
+    start = 0
+    for _ in range(count):
+        duration = rng.randint(800, 5000)
+        text = "\n".join(rng.choice(SAMPLE_TEXTS) for _ in range(lines))
+        cues.append(Cue(start, start + duration, text))
+        start += duration + rng.randint(0, 400)
+    return cues
+
+
+def legacy_parse(srt_content):
+    """evaluate_srt_quality / analyze_real_srt_quality 的逐行解析（比較基準）"""
+    lines = srt_content.strip().split('\n')
+    segments = []
+    i = 0
+    while i < len(lines):
+        if lines[i].strip().isdigit():
+            if i + 2 < len(lines):
+                time_line = lines[i + 1]
+                text_lines = []
+                i += 2
+                while i < len(lines) and lines[i].strip():
+                    text_lines.append(lines[i])
+                    i += 1
+                if text_lines:
+                    segments.append({'time': time_line, 'text': ' '.join(text_lines).strip()})
+        i += 1
+    return segments
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字幕讀寫效能測試")
+    parser.add_argument("--cues", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for lines in (1, 2):
+            cues = synthetic_cues(args.cues, lines=lines)
+            print(f"🎯 {len(cues):,} 段字幕（每段 {lines} 行）")
+            for format in FORMATS:
+                path = Path(directory) / f"bench.{format}"
+                _, elapsed = timed(write_cues, path, cues)
+                size = path.stat().st_size / 1024 / 1024
+                print(f"  寫入 {format.upper():<4} {elapsed * 1000:>8.1f} ms  ({size:.1f} MB)")
+
+            for format in ("srt", "vtt"):
+                path = Path(directory) / f"bench.{format}"
+                parsed, elapsed = timed(lambda p: sum(1 for _ in iter_cues(p)), path)
+                print(f"  解析 {format.upper():<4} {elapsed * 1000:>8.1f} ms  ({parsed:,} 段，mmap 掃描)")
+
+            srt_path = Path(directory) / "bench.srt"
+            segments, elapsed = timed(lambda p: legacy_parse(p.read_text(encoding="utf-8")), srt_path)
+            print(f"  解析 SRT  {elapsed * 1000:>8.1f} ms  ({len(segments):,} 段，舊版逐行解析，不含時間換算)")
+
+
+if __name__ == "__main__":
+    main()
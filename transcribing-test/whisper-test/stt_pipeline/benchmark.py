@@ -0,0 +1,551 @@
+"""
+宣告式模型比較矩陣
+取代 complete_model_comparison、final_definitive_comparison、final_comprehensive_comparison、
+correct_comprehensive_test、professional_model_test 各自寫死的
+供應商 × 模型 × Prompt × 時間戳記粒度 組合：
+
+- 矩陣規格（JSON）展開成所有組合，依供應商實際支援的參數正規化後去除重複
+  （例如 ElevenLabs 不收 prompt、gpt-4o 不支援 verbose_json，這些組合只跑一次）
+- 以有限並行數排程，各供應商輪流排入，單一供應商變慢不會拖住整批
+- 每完成一組立即寫入 SQLite 結果表（主鍵為 矩陣名稱 + run_id）；中斷後重跑同一個命令，已成功的組合直接略過
+- 每列記錄延遲、RTF、CER / WER（有參考逐字稿時）、字幕品質分數與專有名詞命中率；
+  原始轉錄結果另存於 ResponseCache，調整評分方式後以 rescore_matrix（--rescore）重算，不必重新呼叫 API
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import hashlib
+import itertools
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .accuracy import cer, wer
+from .cache import ResponseCache
+from .cues import Cue
+from .engine import PROVIDERS, TranscriptionEngine
+from .quality import score_cues, score_srt
+from .segment_dp import SegmentParams, segment_dp
+from .terms import Glossary
+from .timeline import from_provider
+
+DEFAULT_RESULTS_PATH = "benchmark_results.sqlite"
+DEFAULT_RESULTS_CACHE_DIR = ".benchmark_cache"
+DEFAULT_CONCURRENCY = 8
+
+LANGUAGE_KEYS = {"openai": "language", "groq": "language",
+                 "elevenlabs": "language_code", "assemblyai": "language_code"}
+
+BEST_PROMPT = "美國白宮直接把進口中國商品的關稅，從145%爽拉到245%。中美貿易戰火直接加大馬力。"
+
+# 舊腳本的組合整理成一份規格（python -m stt_pipeline.benchmark --example 輸出）
+EXAMPLE_MATRIX = {
+    "name": "model_comparison",
+    "clips": ["test_audio.mp3"],
+    "references": {},
+    "language": "zh",
+    "profile": "model_comparison",
+    "prompts": {"none": None, "best": BEST_PROMPT},
+    "matrix": [
+        {"provider": "openai", "model": ["whisper-1", "gpt-4o-transcribe", "gpt-4o-mini-transcribe"],
+         "prompt": ["none", "best"], "granularity": [[], ["segment"], ["word"], ["segment", "word"]]},
+        {"provider": "groq", "model": "whisper-large-v3",
+         "prompt": ["none", "best"], "granularity": [[], ["segment", "word"]]},
+        {"provider": "elevenlabs", "model": "scribe_v1", "options": {"diarize": True}},
+        {"provider": "assemblyai", "model": "best",
+         "options": {"speaker_labels": True, "punctuate": True, "format_text": True}},
+    ],
+}
+
+RESULT_COLUMNS = {
+    "run_id": "TEXT NOT NULL",
+    "matrix": "TEXT NOT NULL",
+    "clip": "TEXT",
+    "provider": "TEXT",
+    "model": "TEXT",
+    "prompt": "TEXT",
+    "granularity": "TEXT",
+    "options": "TEXT",
+    "status": "TEXT",
+    "error": "TEXT",
+    "latency_s": "REAL",
+    "audio_s": "REAL",
+    "rtf": "REAL",
+    "cer": "REAL",
+    "wer": "REAL",
+    "quality_score": "REAL",
+    "term_hit_rate": "REAL",
+    "text_length": "INTEGER",
+    "word_count": "INTEGER",
+    "segment_count": "INTEGER",
+    "finished_at": "REAL",
+}
+RESULT_KEY = ("matrix", "run_id")
+
+# 由 score_result 計算的欄位；重新評分時先清空，不留下舊設定算出的值
+METRIC_COLUMNS = ("audio_s", "rtf", "cer", "wer", "quality_score", "term_hit_rate",
+                  "text_length", "word_count", "segment_count")
+
+
+@dataclass(frozen=True)
+class BenchmarkRun:
+    """
+    一組實際送出的請求；options 為正規化後的 API 參數（排序過的 JSON 字串）
+    被供應商忽略的 prompt / granularity 在展開時已清掉，相同請求只會有一個 run_id
+    """
+    clip: str
+    provider: str
+    model: str
+    prompt: str = "none"
+    granularity: tuple = ()
+    options: str = "{}"
+
+    @property
+    def run_id(self):
+        payload = json.dumps([self.clip, self.provider, self.model, self.options],
+                             ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+    def request_options(self):
+        return json.loads(self.options)
+
+
+def _values(value):
+    """矩陣欄位：單一值或清單皆可"""
+    return list(value) if isinstance(value, list) else [value]
+
+
+def _granularities(value):
+    """granularity 可寫 "word"、["segment", "word"] 或 [[], ["word"], ...]"""
+    if value is None:
+        return [()]
+    if isinstance(value, str):
+        return [(value,)]
+    if all(isinstance(item, str) for item in value):
+        return [tuple(value)]
+    return [tuple(_values(item)) if item else () for item in value]
+
+
+def request_options(provider, model, prompt, granularity, language=None, options=None):
+    """
+    依供應商實際支援的參數組出請求，回傳 (options, 生效的 prompt, 生效的 granularity)
+    - openai / groq：prompt、timestamp_granularities（需 verbose_json，未指定視為 ["segment"]）；gpt-4o 系列只支援 json
+    - elevenlabs / assemblyai：沒有 prompt，詞彙級時間戳記固定回傳
+    """
+    result = {}
+    if language:
+        result[LANGUAGE_KEYS[provider]] = language
+    if provider in ("openai", "groq"):
+        if prompt:
+            result["prompt"] = prompt
+        if model.startswith("gpt-4o"):
+            result["response_format"] = "json"
+            granularity = ()
+        else:
+            # verbose_json 不指定時預設就是段落級，[] 與 ["segment"] 是同一個請求
+            result["response_format"] = "verbose_json"
+            result["timestamp_granularities"] = list(granularity or ("segment",))
+            granularity = tuple(granularity or ("segment",))
+    else:
+        prompt = None
+        granularity = ()
+    result.update(options or {})
+    return result, prompt, granularity
+
+
+def expand_matrix(spec, base_dir="."):
+    """
+    展開矩陣規格為去重後的 BenchmarkRun 清單（保持規格中的先後順序）
+    clips 支援 glob，相對路徑以 base_dir 為準；exclude 中的條件全部相符的組合會被剔除
+    """
+    base_dir = Path(base_dir)
+    clips = []
+    for pattern in _values(spec.get("clips", [])):
+        matches = sorted(glob.glob(str(base_dir / pattern)))
+        clips.extend(matches or [str(base_dir / pattern)])
+    prompts = spec.get("prompts", {"none": None})
+    language = spec.get("language")
+    common_options = spec.get("options", {})
+    excludes = spec.get("exclude", [])
+
+    runs = {}
+    for entry in spec.get("matrix", []):
+        provider = entry["provider"]
+        if provider not in PROVIDERS:
+            raise ValueError(f"不支援的供應商: {provider}")
+        options = {**common_options, **entry.get("options", {})}
+        axes = itertools.product(
+            _values(entry.get("clip", clips)),
+            _values(entry["model"]),
+            _values(entry.get("prompt", "none")),
+            _granularities(entry.get("granularity")),
+        )
+        for clip, model, prompt_name, granularity in axes:
+            combination = {"clip": clip, "provider": provider, "model": model,
+                           "prompt": prompt_name, "granularity": list(granularity)}
+            if any(all(combination.get(k) == v for k, v in rule.items()) for rule in excludes):
+                continue
+            if prompt_name not in prompts:
+                raise ValueError(f"未定義的 prompt: {prompt_name}")
+            request, prompt, granularity = request_options(
+                provider, model, prompts[prompt_name], granularity, language, options)
+            run = BenchmarkRun(
+                clip=clip,
+                provider=provider,
+                model=model,
+                prompt=prompt_name if prompt else "none",
+                granularity=tuple(granularity),
+                options=json.dumps(request, ensure_ascii=False, sort_keys=True),
+            )
+            runs.setdefault(run.run_id, run)
+    return list(runs.values())
+
+
+def interleave(runs):
+    """各供應商輪流排列，並行時每家都一直有請求在跑"""
+    by_provider = {}
+    for run in runs:
+        by_provider.setdefault(run.provider, []).append(run)
+    ordered = []
+    for group in itertools.zip_longest(*by_provider.values()):
+        ordered.extend(run for run in group if run is not None)
+    return ordered
+
+
+class ResultStore:
+    """
+    SQLite 結果表，每個矩陣的每組請求一列；以 (matrix, run_id) 為主鍵，重跑時覆寫，
+    同一組請求出現在不同矩陣時各自保留一列
+    """
+
+    def __init__(self, path=DEFAULT_RESULTS_PATH):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        self._migrate()
+        self._create("results")
+        self.connection.commit()
+
+    def _create(self, table):
+        columns = ", ".join(f"{name} {kind}" for name, kind in RESULT_COLUMNS.items())
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ({columns}, PRIMARY KEY ({', '.join(RESULT_KEY)}))")
+
+    def _migrate(self):
+        """舊版結果表以 run_id 單獨為主鍵：改建成 (matrix, run_id) 主鍵並搬移資料"""
+        info = self.connection.execute("PRAGMA table_info(results)").fetchall()
+        if [row["name"] for row in info if row["pk"]] != ["run_id"]:
+            return
+        existing = {row["name"] for row in info}
+        names = [name for name in RESULT_COLUMNS if name in existing]
+        selected = ", ".join("COALESCE(matrix, 'default')" if name == "matrix" else name for name in names)
+        self.connection.execute("ALTER TABLE results RENAME TO results_old")
+        self._create("results")
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO results ({', '.join(names)}) SELECT {selected} FROM results_old")
+        self.connection.execute("DROP TABLE results_old")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def completed(self, matrix=None):
+        """已成功的 run_id 集合（指定 matrix 時只看該矩陣）"""
+        query = "SELECT run_id FROM results WHERE status = 'ok'"
+        if matrix:
+            return {row[0] for row in self.connection.execute(query + " AND matrix = ?", (matrix,))}
+        return {row[0] for row in self.connection.execute(query)}
+
+    def record(self, row):
+        names = [name for name in RESULT_COLUMNS if name in row]
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO results ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})",
+            [row[name] for name in names],
+        )
+        self.connection.commit()
+
+    def rows(self, matrix=None):
+        query = "SELECT * FROM results"
+        params = ()
+        if matrix:
+            query += " WHERE matrix = ?"
+            params = (matrix,)
+        return [dict(row) for row in self.connection.execute(query + " ORDER BY provider, model, prompt", params)]
+
+    def summary(self, matrix=None):
+        """依 供應商 × 模型 × Prompt × 粒度 彙總（跨音檔平均）"""
+        where = "WHERE matrix = ?" if matrix else ""
+        query = f"""
+            SELECT provider, model, prompt, granularity,
+                   COUNT(*) AS runs, SUM(status = 'ok') AS ok,
+                   AVG(latency_s) AS latency_s, AVG(rtf) AS rtf, AVG(cer) AS cer, AVG(wer) AS wer,
+                   AVG(quality_score) AS quality_score, AVG(term_hit_rate) AS term_hit_rate
+            FROM results {where}
+            GROUP BY provider, model, prompt, granularity
+            ORDER BY quality_score DESC
+        """
+        return [dict(row) for row in self.connection.execute(query, (matrix,) if matrix else ())]
+
+    def export_csv(self, path, matrix=None):
+        rows = self.rows(matrix)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(RESULT_COLUMNS))
+            writer.writeheader()
+            writer.writerows(rows)
+        return len(rows)
+
+
+def audio_duration(result, timeline=None):
+    """從轉錄結果取音檔長度（秒）：OpenAI / Groq 的 duration、AssemblyAI 的 audio_duration，否則用最後一個詞"""
+    for key in ("duration", "audio_duration"):
+        value = result.get(key)
+        if value:
+            return float(value)
+    if timeline is not None and len(timeline):
+        return max(timeline.ends) / 1000
+    return None
+
+
+def result_cues(result, timeline, params):
+    """有段落就評供應商自己的段落（舊腳本的比較方式），只有詞彙時以 segment_dp 斷句"""
+    segments = result.get("segments") or []
+    if segments:
+        return [Cue(round(s.get("start", 0) * 1000), round(s.get("end", 0) * 1000), s.get("text", ""))
+                for s in segments]
+    if len(timeline):
+        return segment_dp(timeline, params)
+    return None
+
+
+def score_result(run, result, latency, reference=None, glossary=None, profile="default", params=None):
+    """計算一列結果的所有指標"""
+    metrics = {"latency_s": latency}
+    text = result.get("text", "")
+    options = run.request_options()
+    if options.get("response_format") in ("srt", "vtt"):
+        quality = score_srt(text, profile)
+        metrics["segment_count"] = quality.count
+        metrics["quality_score"] = quality.score
+        return metrics
+
+    timeline = from_provider(run.provider, result)
+    duration = audio_duration(result, timeline)
+    if duration:
+        metrics["audio_s"] = duration
+        metrics["rtf"] = latency / duration
+    metrics["text_length"] = len(text)
+    metrics["word_count"] = sum(1 for _ in result.get("words") or [])
+    cues = result_cues(result, timeline, params or SegmentParams())
+    if cues:
+        metrics["segment_count"] = len(cues)
+        metrics["quality_score"] = score_cues(cues, profile).score
+    if reference is not None:
+        metrics["cer"] = cer(reference, text, with_ops=False).rate
+        metrics["wer"] = wer(reference, text, with_ops=False).rate
+    if glossary is not None:
+        report = glossary.check(timeline if len(timeline) else text)
+        metrics["term_hit_rate"] = report.hit_rate
+    return metrics
+
+
+def load_references(spec, base_dir="."):
+    """
+    參考逐字稿：references 為 {音檔: 文字檔} 或一個目錄（以音檔主檔名 .txt 對應）
+    回傳 {音檔路徑: 文字}
+    """
+    base_dir = Path(base_dir)
+    references = spec.get("references") or {}
+    result = {}
+    if isinstance(references, str):
+        directory = base_dir / references
+        for path in directory.glob("*.txt"):
+            result[path.stem] = path.read_text(encoding="utf-8")
+        return result
+    for clip, path in references.items():
+        result[str(base_dir / clip)] = (base_dir / path).read_text(encoding="utf-8")
+    return result
+
+
+def _reference_for(references, clip):
+    return references.get(clip, references.get(Path(clip).stem))
+
+
+def _scoring(spec, base_dir="."):
+    """規格中的評分設定：(參考逐字稿, 詞彙表, 品質評分設定, 斷句參數)"""
+    references = load_references(spec, base_dir)
+    glossary = Glossary(spec["terms"]) if spec.get("terms") else Glossary()
+    profile = spec.get("profile", "default")
+    params = SegmentParams(**spec.get("segment_params", {}))
+    return references, glossary, profile, params
+
+
+async def run_matrix(spec, engine, store, base_dir=".", concurrency=None, retry_failed=True,
+                     results_cache=None, progress=print):
+    """
+    執行矩陣；這個矩陣已成功的組合略過（retry_failed=False 時失敗的也略過）
+    回傳這次實際執行的列
+    """
+    matrix = spec.get("name", "default")
+    runs = expand_matrix(spec, base_dir)
+    done = store.completed(matrix)
+    if not retry_failed:
+        done |= {row["run_id"] for row in store.rows(matrix)}
+    pending = interleave([run for run in runs if run.run_id not in done])
+    progress(f"🎯 {matrix}: {len(runs)} 組（去重後），略過 {len(runs) - len(pending)} 組已完成")
+
+    references, glossary, profile, params = _scoring(spec, base_dir)
+    semaphore = asyncio.Semaphore(concurrency or spec.get("concurrency", DEFAULT_CONCURRENCY))
+    rows = []
+
+    async def execute(run):
+        row = {
+            "run_id": run.run_id, "matrix": matrix, "clip": run.clip, "provider": run.provider,
+            "model": run.model, "prompt": run.prompt, "granularity": "+".join(run.granularity) or "-",
+            "options": run.options,
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await engine.transcribe(run.clip, run.provider, run.model,
+                                                 run.request_options(), use_cache=False)
+            except Exception as e:
+                row.update(status="error", error=str(e), latency_s=time.perf_counter() - started)
+                result = None
+            latency = time.perf_counter() - started
+
+        if result is not None:
+            if results_cache is not None:
+                await asyncio.to_thread(results_cache.put, run.run_id, result)
+            reference = _reference_for(references, run.clip)
+            try:
+                metrics = await asyncio.to_thread(score_result, run, result, latency, reference,
+                                                  glossary, profile, params)
+                row.update(status="ok", error=None, **metrics)
+            except Exception as e:
+                row.update(status="score_error", error=str(e), latency_s=latency)
+        row["finished_at"] = time.time()
+        store.record(row)
+        rows.append(row)
+        mark = "✅" if row["status"] == "ok" else "❌"
+        progress(f"{mark} [{len(rows)}/{len(pending)}] {run.provider}/{run.model} "
+                 f"prompt={run.prompt} granularity={row['granularity']} {Path(run.clip).name} "
+                 f"{row['latency_s']:.1f}s")
+
+    await asyncio.gather(*(execute(run) for run in pending))
+    return rows
+
+
+def rescore_matrix(spec, store, results_cache, base_dir=".", progress=print):
+    """
+    以 results_cache 中的原始轉錄結果重新計算這個矩陣已取得結果的列（不呼叫 API），
+    修改評分設定、參考逐字稿、詞彙表或斷句參數後使用；延遲沿用原本的紀錄。
+    回傳更新後的列
+    """
+    matrix = spec.get("name", "default")
+    runs = {run.run_id: run for run in expand_matrix(spec, base_dir)}
+    references, glossary, profile, params = _scoring(spec, base_dir)
+    rows = []
+    missing = 0
+    for row in store.rows(matrix):
+        run = runs.get(row["run_id"])
+        if run is None or row["status"] not in ("ok", "score_error"):
+            continue
+        result = results_cache.get(run.run_id)
+        if result is None:
+            missing += 1
+            continue
+        row.update(dict.fromkeys(METRIC_COLUMNS))
+        try:
+            metrics = score_result(run, result, row["latency_s"], _reference_for(references, run.clip),
+                                   glossary, profile, params)
+            row.update(status="ok", error=None, **metrics)
+        except Exception as e:
+            row.update(status="score_error", error=str(e))
+        store.record(row)
+        rows.append(row)
+    progress(f"🔁 {matrix}: 重新評分 {len(rows)} 組，{missing} 組沒有快取的原始結果")
+    return rows
+
+
+def _cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def format_summary(rows):
+    headers = ["provider", "model", "prompt", "granularity", "runs", "ok",
+               "latency_s", "rtf", "cer", "wer", "quality_score", "term_hit_rate"]
+    lines = [[_cell(row[h]) for h in headers] for row in rows]
+    widths = [max(len(h), *(len(line[i]) for line in lines)) if lines else len(h)
+              for i, h in enumerate(headers)]
+    output = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    output.append("  ".join("-" * w for w in widths))
+    for line in lines:
+        output.append("  ".join(cell.ljust(w) for cell, w in zip(line, widths)))
+    return "\n".join(output)
+
+
+def load_matrix(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="宣告式模型比較矩陣")
+    parser.add_argument("matrix", nargs="?", help="矩陣規格 JSON")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_PATH, help="SQLite 結果檔")
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--dry-run", action="store_true", help="只列出展開後的組合")
+    parser.add_argument("--skip-failed", action="store_true", help="先前失敗的組合不重試")
+    parser.add_argument("--summary", action="store_true", help="只輸出現有結果的彙總")
+    parser.add_argument("--rescore", action="store_true", help="以快取的原始結果重新評分，不呼叫 API")
+    parser.add_argument("--export", help="把結果匯出成 CSV")
+    parser.add_argument("--example", action="store_true", help="輸出範例規格（舊腳本的組合）")
+    args = parser.parse_args()
+
+    if args.example:
+        print(json.dumps(EXAMPLE_MATRIX, ensure_ascii=False, indent=2))
+        return
+    if not args.matrix and not args.summary:
+        parser.error("需要矩陣規格檔")
+
+    spec = load_matrix(args.matrix) if args.matrix else {}
+    base_dir = Path(args.matrix).parent if args.matrix else Path(".")
+    if args.dry_run:
+        for run in expand_matrix(spec, base_dir):
+            print(run.run_id, run.provider, run.model, run.prompt,
+                  "+".join(run.granularity) or "-", run.clip)
+        return
+
+    matrix = spec.get("name") if spec else None
+    with ResultStore(args.results) as store:
+        if args.rescore:
+            rescore_matrix(spec, store, ResponseCache(DEFAULT_RESULTS_CACHE_DIR), base_dir)
+        elif not args.summary:
+            async def run():
+                async with TranscriptionEngine() as engine:
+                    await run_matrix(spec, engine, store, base_dir, args.concurrency,
+                                     retry_failed=not args.skip_failed,
+                                     results_cache=ResponseCache(DEFAULT_RESULTS_CACHE_DIR))
+            asyncio.run(run())
+        print(format_summary(store.summary(matrix)))
+        if args.export:
+            count = store.export_csv(args.export, matrix)
+            print(f"💾 {count} 列已匯出到 {args.export}")
+
+
+if __name__ == "__main__":
+    main()
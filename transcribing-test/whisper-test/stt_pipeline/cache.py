@@ -0,0 +1,149 @@
+"""
+以內容定址的轉錄結果快取
+鍵值 = 音檔 SHA-256 + 供應商 + 模型 + 正規化後的參數，
+項目以 gzip 壓縮存在磁碟上，總大小超過上限時依最近使用時間淘汰
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from .uploader import hash_audio
+
+DEFAULT_CACHE_DIR = ".transcription_cache"
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+# 參數名稱的同義詞，統一後再計算鍵值
+OPTION_ALIASES = {
+    "language_code": "language",
+    "timestamp_granularities[]": "timestamp_granularities",
+}
+
+
+def _normalize_value(key, value):
+    if isinstance(value, str):
+        value = value.strip()
+        if value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        if key == "language":
+            return value.lower()
+        return value
+    if isinstance(value, (list, tuple)):
+        values = [_normalize_value(key, v) for v in value]
+        # 粒度清單的順序不影響結果
+        return sorted(values) if key == "timestamp_granularities" else values
+    return value
+
+
+def normalize_options(options):
+    """去掉 None 值、統一名稱與格式，讓等價的參數組合得到同一個鍵值"""
+    normalized = {}
+    for key, value in (options or {}).items():
+        if value is None:
+            continue
+        key = OPTION_ALIASES.get(key, key)
+        value = _normalize_value(key, value)
+        if value == "" or value == []:
+            continue
+        normalized[key] = value
+    return normalized
+
+
+def cache_key(audio_sha256, provider, model, options=None):
+    payload = json.dumps(
+        [audio_sha256, provider, model, normalize_options(options)],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    磁碟快取
+    每個項目一個 .json.gz 檔，檔案 mtime 即最近使用時間（命中時更新）
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json.gz"
+
+    def key_for(self, audio, provider, model, options=None):
+        """audio 為路徑或 bytes"""
+        return cache_key(hash_audio(audio), provider, model, options)
+
+    def get(self, key):
+        """回傳快取的結果 dict，沒有則 None"""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        old_size = path.stat().st_size if path.exists() else 0
+
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        # 總大小只在第一次寫入時掃描目錄，之後累加；超過上限才重新掃描淘汰
+        if self._total_bytes is None:
+            self._total_bytes = self.size()
+        else:
+            self._total_bytes += path.stat().st_size - old_size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """回傳 (mtime, size, path) 清單"""
+        items = []
+        for path in self.directory.glob("*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            items.append((stat.st_mtime, stat.st_size, path))
+        return items
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """總大小超過上限時，從最久未使用的項目開始刪除"""
+        items = self.entries()
+        total = sum(size for _, size, _ in items)
+        self._total_bytes = total
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(items):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        return removed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
+        self._total_bytes = 0
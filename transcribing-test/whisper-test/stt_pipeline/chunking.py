@@ -0,0 +1,285 @@
+"""
+依靜音切段的長音檔並行轉錄
+用 ffmpeg silencedetect 找出低能量區段，在目標長度附近切段並行送出，
+再把各段的詞彙 / 段落時間戳記換算回同一條時間軸，重疊區的詞彙只保留一次
+"""
+
+import asyncio
+import re
+import subprocess
+
+# silencedetect 的預設門檻：低於 -35 dB 且持續 0.3 秒以上視為靜音
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_DURATION = 0.3
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(\d+(?:\.\d+)?)")
+
+
+def detect_silences(audio_path, noise_db=SILENCE_NOISE_DB, min_duration=SILENCE_MIN_DURATION):
+    """
+    回傳 (音檔總長秒數, [(靜音開始, 靜音結束), ...])
+    只解碼一次音檔，需要系統安裝 ffmpeg
+    """
+    command = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", str(audio_path),
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_duration}",
+        "-f", "null", "-",
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    return parse_silencedetect(completed.stderr)
+
+
+def parse_silencedetect(stderr):
+    """解析 ffmpeg silencedetect 的輸出"""
+    duration = 0.0
+    match = _DURATION_RE.search(stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences = []
+    start = None
+    for line in stderr.splitlines():
+        match = _SILENCE_START_RE.search(line)
+        if match:
+            start = max(float(match.group(1)), 0.0)
+            continue
+        match = _SILENCE_END_RE.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+
+    # 音檔結尾仍在靜音中
+    if start is not None and duration:
+        silences.append((start, duration))
+    return duration, silences
+
+
+def choose_cut_points(duration, silences, target=30.0, tolerance=0.35):
+    """
+    在每個目標長度附近挑一個靜音點切段
+    候選範圍為 target × (1 ± tolerance)，優先選較長且離目標較近的靜音；
+    範圍內沒有靜音時直接在目標長度硬切
+    """
+    cuts = []
+    position = 0.0
+    index = 0
+    lower_ratio, upper_ratio = 1 - tolerance, 1 + tolerance
+
+    while duration - position > target * upper_ratio:
+        desired = position + target
+        lower = position + target * lower_ratio
+        upper = position + target * upper_ratio
+
+        # silences 已依時間排序，跳過已經在 lower 之前的靜音
+        while index < len(silences) and (silences[index][0] + silences[index][1]) / 2 < lower:
+            index += 1
+
+        best = None
+        best_score = None
+        scan = index
+        while scan < len(silences):
+            start, end = silences[scan]
+            middle = (start + end) / 2
+            if middle > upper:
+                break
+            score = (end - start) - abs(middle - desired) / target
+            if best_score is None or score > best_score:
+                best, best_score = middle, score
+            scan += 1
+
+        cut = best if best is not None else desired
+        cuts.append(cut)
+        position = cut
+    return cuts
+
+
+def plan_chunks(duration, cuts, overlap=1.0):
+    """
+    由切點產生 [(chunk_start, chunk_end, owned_start, owned_end), ...]
+    chunk 範圍前後各多送 overlap 秒，owned 範圍是去重時該段負責保留的區間
+    """
+    bounds = [0.0, *cuts, duration]
+    chunks = []
+    for owned_start, owned_end in zip(bounds, bounds[1:]):
+        chunks.append((
+            max(owned_start - overlap, 0.0),
+            min(owned_end + overlap, duration),
+            owned_start,
+            owned_end,
+        ))
+    return chunks
+
+
+def extract_chunk(audio_path, start, end, sample_rate=16000):
+    """用 ffmpeg 擷取一段音訊並轉成 16 kHz 單聲道 FLAC，回傳 (檔名, bytes)"""
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", str(audio_path),
+        "-ac", "1", "-ar", str(sample_rate), "-f", "flac", "-",
+    ]
+    completed = subprocess.run(command, capture_output=True, check=True)
+    return f"chunk_{start:09.3f}.flac", completed.stdout
+
+
+def _time_scale(provider):
+    """AssemblyAI 以毫秒為單位，其他供應商以秒為單位"""
+    return 1000 if provider == "assemblyai" else 1
+
+
+def _rebase(item, offset):
+    """時間加上 offset；AssemblyAI utterances 內還有自己的 words"""
+    rebased = {**item, "start": item["start"] + offset, "end": item["end"] + offset}
+    if isinstance(item.get("words"), list):
+        rebased["words"] = [_rebase(word, offset) for word in item["words"] if _is_timed(word)]
+    return rebased
+
+
+def _is_timed(item):
+    return item.get("start") is not None and item.get("end") is not None
+
+
+def _middle(item):
+    return (item["start"] + item["end"]) / 2
+
+
+def _word_text(word):
+    return word.get("text", word.get("word", ""))
+
+
+def _join_words(provider, words, separator):
+    """ElevenLabs 的詞含 spacing 項目直接串接，其他供應商以 separator 分詞"""
+    if provider == "elevenlabs":
+        return "".join(_word_text(word) for word in words)
+    return separator.join(_word_text(word).strip() for word in words)
+
+
+class _Ownership:
+    """一段負責保留的時間區間（已乘上供應商的時間單位）"""
+
+    def __init__(self, owned_start, owned_end, scale, is_last):
+        self.start = owned_start * scale
+        self.end = owned_end * scale
+        self.is_last = is_last
+
+    def owns(self, item):
+        """中點落在區間內的項目歸這一段"""
+        middle = _middle(item)
+        return self.start <= middle and (middle < self.end or self.is_last)
+
+    def contains(self, item):
+        """整個項目都在區間內"""
+        return self.start <= item["start"] and (item["end"] <= self.end or self.is_last)
+
+
+def _clip_spans(provider, spans, words, ownership, separator):
+    """
+    段落 / utterance 去重：整段落在 owned 區間內的保留原樣；
+    跨過邊界的只留下歸這一段的詞，並以這些詞重組文字與起訖時間。
+    span 自帶 words（utterance）時以自己的詞為準，否則取中點落在 span 內、已去重的 words；
+    沒有任何詞彙資料時只能整段依中點歸屬
+    """
+    kept = []
+    for span in spans:
+        if ownership.contains(span):
+            kept.append(span)
+            continue
+        nested = span.get("words")
+        if isinstance(nested, list):
+            members = [word for word in nested if ownership.owns(word)]
+        elif words:
+            members = [word for word in words if span["start"] <= _middle(word) < span["end"]]
+        else:
+            if ownership.owns(span):
+                kept.append(span)
+            continue
+        if not members:
+            continue
+        text = span.get("text", "")
+        leading = text[:len(text) - len(text.lstrip())]
+        clipped = {**span, "start": members[0]["start"], "end": members[-1]["end"],
+                   "text": leading + _join_words(provider, members, separator)}
+        if isinstance(nested, list):
+            clipped["words"] = members
+        kept.append(clipped)
+    return kept
+
+
+def stitch_results(provider, chunks, results):
+    """
+    合併各段轉錄結果成一份與供應商格式相同的 dict
+    words 換算成整體時間軸後依中點歸屬，重疊區只保留一次；
+    segments / utterances 跨過切點的部分以歸屬的詞重組，與 words 一致。
+    有詞彙時 text 由去重後的 words 組成
+    """
+    scale = _time_scale(provider)
+    merged = {"words": [], "segments": [], "utterances": []}
+    texts = [result.get("text", "") for result in results]
+    # 英文等以空白分詞的語言保留空白
+    separator = " " if any(" " in text.strip() for text in texts) else ""
+
+    for i, ((chunk_start, _, owned_start, owned_end), result) in enumerate(zip(chunks, results)):
+        offset = round(chunk_start * scale, 3) if scale == 1 else round(chunk_start * scale)
+        ownership = _Ownership(owned_start, owned_end, scale, i == len(chunks) - 1)
+        rebased = {
+            field: [_rebase(item, offset) for item in result.get(field) or [] if _is_timed(item)]
+            for field in merged
+        }
+        words = [word for word in rebased["words"] if ownership.owns(word)]
+        merged["words"].extend(words)
+        for field in ("segments", "utterances"):
+            merged[field].extend(_clip_spans(provider, rebased[field], words, ownership, separator))
+
+    stitched = dict(results[0]) if results else {}
+    for field, items in merged.items():
+        if items or stitched.get(field):
+            stitched[field] = items
+
+    if merged["words"]:
+        stitched["text"] = _join_words(provider, merged["words"], separator).strip()
+    elif merged["segments"]:
+        stitched["text"] = "".join(seg.get("text", "") for seg in merged["segments"]).strip()
+    else:
+        stitched["text"] = separator.join(t.strip() for t in texts)
+
+    total_duration = chunks[-1][1] if chunks else 0.0
+    if "duration" in stitched:
+        stitched["duration"] = total_duration
+    if "audio_duration" in stitched:
+        stitched["audio_duration"] = total_duration
+
+    for segment_id, segment in enumerate(merged["segments"]):
+        if "id" in segment:
+            segment["id"] = segment_id
+
+    stitched["chunks"] = [
+        {"start": chunk_start, "end": chunk_end, "owned_start": owned_start, "owned_end": owned_end}
+        for chunk_start, chunk_end, owned_start, owned_end in chunks
+    ]
+    return stitched
+
+
+async def transcribe_chunked(engine, audio_path, provider, model, options=None,
+                             target=30.0, tolerance=0.35, overlap=1.0, concurrency=8):
+    """
+    切段並行轉錄長音檔
+    短於 target × (1 + tolerance) 的音檔不切段，直接整段送出
+    """
+    duration, silences = await asyncio.to_thread(detect_silences, audio_path)
+    cuts = choose_cut_points(duration, silences, target, tolerance)
+    if not cuts:
+        return await engine.transcribe(audio_path, provider, model, options)
+
+    chunks = plan_chunks(duration, cuts, overlap)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(chunk):
+        chunk_start, chunk_end, _, _ = chunk
+        async with semaphore:
+            audio = await asyncio.to_thread(extract_chunk, audio_path, chunk_start, chunk_end)
+            return await engine.transcribe(audio, provider, model, options)
+
+    results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    return stitch_results(provider, chunks, results)
@@ -0,0 +1,18 @@
+"""
+字幕段落（cue）與音效事件資料結構
+時間一律為整數毫秒，speaker 沒有說話者資訊時為 None
+"""
+
+from collections import namedtuple
+
+Cue = namedtuple("Cue", ["start", "end", "text", "speaker"], defaults=[None])
+
+# 音效事件（笑聲、掌聲、背景音樂）；前四個欄位與 Cue 相同，可直接交給 subtitle_io 輸出
+AudioEvent = namedtuple("AudioEvent", ["start", "end", "text", "speaker", "label"], defaults=[None, ""])
+
+_EVENT_BRACKETS = "[]()（）【】"
+
+
+def event_label(text):
+    """ElevenLabs 的事件文字如 "[舒缓的背景音乐]"、"(laughter)"，去掉括號作為標籤"""
+    return text.strip().strip(_EVENT_BRACKETS).strip()
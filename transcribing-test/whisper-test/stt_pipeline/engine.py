@@ -0,0 +1,389 @@
+"""
+非同步多供應商轉錄引擎
+OpenAI / Groq / ElevenLabs Scribe / AssemblyAI 共用同一個 transcribe() 介面，
+每個主機維持一個 keep-alive 連線池，避免每個音檔都重新做 TLS 握手
+"""
+
+import asyncio
+import time
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+
+from .cache import ResponseCache
+from .errors import TranscriptionError
+from .poller import AssemblyAIPoller
+from .rate_limit import KeyScheduler, keys_from_env, parse_retry_after
+from .uploader import AssemblyAIUploader
+
+# 載入環境變數
+load_dotenv()
+
+# 各供應商的 API 端點與金鑰環境變數
+PROVIDERS = {
+    "openai": {
+        "base_url": "https://api.openai.com/v1",
+        "env_key": "OPENAI_API_KEY",
+    },
+    "groq": {
+        "base_url": "https://api.groq.com/openai/v1",
+        "env_key": "GROQ_API_KEY",
+    },
+    "elevenlabs": {
+        "base_url": "https://api.elevenlabs.io",
+        "env_key": "ELEVENLABS_API_KEY",
+    },
+    "assemblyai": {
+        "base_url": "https://api.assemblyai.com",
+        "env_key": "ASSEMBLYAI_API_KEY",
+    },
+}
+
+AUDIO_MIME_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".m4a": "audio/mp4",
+    ".flac": "audio/flac",
+    ".ogg": "audio/ogg",
+    ".webm": "audio/webm",
+}
+
+
+def load_audio(audio):
+    """
+    將音檔來源統一成 (檔名, bytes, MIME)
+    audio 可以是檔案路徑、bytes，或已經整理好的 (檔名, bytes) tuple
+    """
+    if isinstance(audio, tuple):
+        filename, data = audio
+    elif isinstance(audio, (bytes, bytearray, memoryview)):
+        filename, data = "audio.mp3", bytes(audio)
+    else:
+        path = Path(audio)
+        filename, data = path.name, path.read_bytes()
+
+    mime = AUDIO_MIME_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream")
+    return filename, data, mime
+
+
+def _form_value(value):
+    """multipart 欄位只能是字串，布林值轉成 API 接受的小寫格式"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return [_form_value(v) for v in value]
+    return str(value)
+
+
+class TranscriptionEngine:
+    """
+    多供應商轉錄引擎
+    同一主機的請求共用一個 httpx.AsyncClient，連線在請求之間保持 keep-alive；
+    連線池、金鑰排程器與輪詢器綁定使用時的事件迴圈，換到新的迴圈（再次 asyncio.run）時重新建立
+
+    api_keys 的值可以是單一金鑰或金鑰清單；未指定時讀取 XXX_API_KEY、XXX_API_KEY_2…
+    rate_limits 為 {供應商: 每秒請求數} 或 {供應商: (每秒請求數, 突發量)}，套用在每把金鑰上
+    """
+
+    def __init__(self, api_keys=None, base_urls=None, max_connections=20,
+                 keepalive_expiry=60.0, timeout=300.0, poller_options=None,
+                 upload_registry=None, cache=None, rate_limits=None, max_rate_limit_retries=3):
+        self.api_keys = dict(api_keys or {})
+        self.base_urls = dict(base_urls or {})
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=15.0)
+        self.poller = AssemblyAIPoller(self, **(poller_options or {}))
+        self.uploader = AssemblyAIUploader(self, registry=upload_registry)
+        self.cache = cache
+        self.rate_limits = dict(rate_limits or {})
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self._schedulers = {}
+        self._clients = {}
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """關閉所有連線池"""
+        clients, self._clients = self._clients, {}
+        if self._loop is asyncio.get_running_loop():
+            await asyncio.gather(*(client.aclose() for client in clients.values()))
+
+    def _bind_loop(self):
+        """
+        連線池與排程器只能在建立它們的事件迴圈中使用；
+        在另一個迴圈中被呼叫時捨棄舊迴圈的狀態（舊迴圈已結束，連線無法再使用或關閉）
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._clients = {}
+            self._schedulers = {}
+
+    def provider_keys(self, provider):
+        """該供應商可用的所有金鑰"""
+        keys = self.api_keys.get(provider)
+        if isinstance(keys, str):
+            keys = [keys]
+        keys = list(keys or keys_from_env(PROVIDERS[provider]["env_key"]))
+        if not keys:
+            raise TranscriptionError(provider, f"{PROVIDERS[provider]['env_key']} 未設定")
+        return keys
+
+    def api_key(self, provider):
+        """第一把金鑰（不經排程的請求使用）"""
+        return self.provider_keys(provider)[0]
+
+    def scheduler(self, provider):
+        """取得（或建立）該供應商的多金鑰排程器"""
+        self._bind_loop()
+        scheduler = self._schedulers.get(provider)
+        if scheduler is None:
+            limit = self.rate_limits.get(provider)
+            rate, burst = limit if isinstance(limit, tuple) else (limit, 1)
+            scheduler = KeyScheduler(self.provider_keys(provider), rate=rate, burst=burst)
+            self._schedulers[provider] = scheduler
+        return scheduler
+
+    async def with_key(self, provider, func):
+        """
+        由排程器挑一把金鑰執行 func(api_key)
+        遇到 429 時依 Retry-After 暫停該金鑰並換一把重試
+        """
+        scheduler = self.scheduler(provider)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            key = await scheduler.acquire()
+            try:
+                return await func(key)
+            except TranscriptionError as e:
+                if e.status_code != 429 or attempt == self.max_rate_limit_retries:
+                    raise
+                scheduler.penalize(key, e.retry_after)
+            finally:
+                scheduler.release(key)
+
+    def base_url(self, provider):
+        return self.base_urls.get(provider, PROVIDERS[provider]["base_url"]).rstrip("/")
+
+    def client_for(self, url):
+        """取得（或建立）該主機專屬的連線池"""
+        self._bind_loop()
+        host = httpx.URL(url).netloc
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._clients[host] = client
+        return client
+
+    async def request(self, provider, method, url, **kwargs):
+        """送出請求並檢查狀態碼，回傳 httpx.Response"""
+        response = await self.client_for(url).request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise TranscriptionError(
+                provider,
+                f"HTTP {response.status_code}",
+                status_code=response.status_code,
+                body=response.text,
+                retry_after=parse_retry_after(response.headers.get("retry-after")),
+            )
+        return response
+
+    async def transcribe(self, audio, provider, model, options=None, use_cache=True):
+        """
+        轉錄一個音檔，回傳供應商原始的 JSON 結果（dict）
+        設定了 cache 時，先以內容雜湊查快取，命中就不送出任何網路請求
+
+        options 直接對應各供應商的 API 參數，例如：
+        - openai / groq: language, prompt, response_format, timestamp_granularities
+        - elevenlabs: language_code, diarize, tag_audio_events
+        - assemblyai: language_code, speaker_labels, punctuate, format_text
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"不支援的供應商: {provider}")
+
+        options = dict(options or {})
+        if self.cache is None or not use_cache:
+            return await self._transcribe(audio, provider, model, options)
+
+        content = audio[1] if isinstance(audio, tuple) else audio
+        key = await asyncio.to_thread(self.cache.key_for, content, provider, model, options)
+        result = await asyncio.to_thread(self.cache.get, key)
+        if result is None:
+            result = await self._transcribe(audio, provider, model, options)
+            await asyncio.to_thread(self.cache.put, key, result)
+        return result
+
+    async def _transcribe(self, audio, provider, model, options):
+        if provider == "assemblyai":
+            # AssemblyAI 走串流上傳，檔案路徑不需先整個讀進記憶體
+            return await self._transcribe_assemblyai(audio, model, options)
+
+        audio = load_audio(audio)
+        if provider in ("openai", "groq"):
+            return await self.with_key(
+                provider,
+                lambda key: self._transcribe_openai_compatible(provider, audio, model, options, key),
+            )
+        return await self.with_key(
+            provider, lambda key: self._transcribe_elevenlabs(audio, model, options, key)
+        )
+
+    async def _transcribe_openai_compatible(self, provider, audio, model, options, api_key):
+        """OpenAI 與 Groq 共用 /audio/transcriptions 格式"""
+        url = f"{self.base_url(provider)}/audio/transcriptions"
+        headers = {"Authorization": f"Bearer {api_key}"}
+
+        data = {"model": model, "response_format": "verbose_json"}
+        for key, value in options.items():
+            if value is None:
+                continue
+            # timestamp_granularities 在 multipart 中要用陣列欄位名稱
+            if key == "timestamp_granularities":
+                key = "timestamp_granularities[]"
+            data[key] = _form_value(value)
+
+        filename, content, mime = audio
+        response = await self.request(
+            provider, "POST", url,
+            headers=headers, data=data, files={"file": (filename, content, mime)},
+        )
+
+        # srt / text 格式回傳純文字
+        if "json" not in response.headers.get("content-type", ""):
+            return {"text": response.text}
+        return response.json()
+
+    async def _transcribe_elevenlabs(self, audio, model, options, api_key):
+        url = f"{self.base_url('elevenlabs')}/v1/speech-to-text"
+        headers = {"xi-api-key": api_key}
+
+        data = {"model_id": model}
+        data.update({k: _form_value(v) for k, v in options.items() if v is not None})
+
+        filename, content, mime = audio
+        response = await self.request(
+            "elevenlabs", "POST", url,
+            headers=headers, data=data, files={"file": (filename, content, mime)},
+        )
+        return response.json()
+
+    async def _transcribe_assemblyai(self, audio, model, options):
+        """
+        上傳 → 建立任務 → 輪詢，三個步驟共用同一個連線池
+        upload_url 與 transcript id 只對建立它的帳號有效，因此全程使用同一把金鑰；
+        只有上傳與建立任務遇到 429 時換金鑰重試，任務建立後輪詢的 429 交給輪詢器退避，
+        不會在另一把金鑰上重送一份計費的任務
+        """
+        async def submit(api_key):
+            audio_url = await self.upload_assemblyai(audio, api_key)
+            started = time.monotonic()
+            transcript_id = await self.submit_assemblyai(audio_url, model, options, api_key)
+            return transcript_id, started, api_key
+
+        transcript_id, started, api_key = await self.with_key("assemblyai", submit)
+        return await self.wait_assemblyai(transcript_id, started=started, api_key=api_key)
+
+    async def upload_assemblyai(self, audio, api_key=None):
+        """上傳音檔（已上傳過的相同內容直接沿用），回傳 AssemblyAI 的 upload_url"""
+        if isinstance(audio, tuple):
+            audio = audio[1]
+        return await self.uploader.upload(audio, api_key or self.api_key("assemblyai"))
+
+    async def submit_assemblyai(self, audio_url, model, options, api_key=None):
+        """建立轉錄任務，回傳 transcript id"""
+        url = f"{self.base_url('assemblyai')}/v2/transcript"
+        headers = {"authorization": api_key or self.api_key("assemblyai")}
+
+        body = {"audio_url": audio_url}
+        if model:
+            body["speech_model"] = model
+        body.update({k: v for k, v in options.items() if v is not None})
+
+        response = await self.request("assemblyai", "POST", url, headers=headers, json=body)
+        return response.json()["id"]
+
+    async def fetch_assemblyai(self, transcript_id, api_key=None):
+        """查詢一次轉錄任務狀態"""
+        url = f"{self.base_url('assemblyai')}/v2/transcript/{transcript_id}"
+        headers = {"authorization": api_key or self.api_key("assemblyai")}
+        response = await self.request("assemblyai", "GET", url, headers=headers)
+        return response.json()
+
+    async def wait_assemblyai(self, transcript_id, audio_duration=None, started=None, api_key=None):
+        """交給共用輪詢器等待任務完成"""
+        return await self.poller.wait(transcript_id, audio_duration, started, api_key)
+
+    async def transcribe_many(self, jobs, concurrency=8):
+        """
+        並行轉錄多個音檔
+        jobs 為 (audio, provider, model, options) 的序列，回傳順序與 jobs 相同；
+        失敗的任務以例外物件佔位，不會中斷其他任務
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(job):
+            async with semaphore:
+                return await self.transcribe(*job)
+
+        return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
+
+
+_default_engine = None
+_active_calls = 0
+
+
+def get_engine():
+    """取得模組共用的引擎（共用連線池與磁碟快取）"""
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = TranscriptionEngine(cache=ResponseCache())
+    return _default_engine
+
+
+async def transcribe(audio, provider, model, options=None):
+    """
+    使用共用引擎轉錄單一音檔
+    同一迴圈中並行的呼叫共用連線池，最後一個呼叫結束時關閉；
+    舊腳本逐一 asyncio.run(transcribe(...)) 也不會留下綁定已關閉迴圈的連線
+    """
+    global _active_calls
+    engine = get_engine()
+    _active_calls += 1
+    try:
+        return await engine.transcribe(audio, provider, model, options)
+    finally:
+        _active_calls -= 1
+        if not _active_calls:
+            await engine.aclose()
+
+
+def main():
+    """簡單示範：同一音檔並行送給 Groq 與 ElevenLabs"""
+    audio_file = "test_audio.mp3"
+    jobs = [
+        (audio_file, "groq", "whisper-large-v3", {"language": "zh"}),
+        (audio_file, "elevenlabs", "scribe_v1", {}),
+    ]
+
+    async def run():
+        async with TranscriptionEngine() as engine:
+            return await engine.transcribe_many(jobs)
+
+    for (_, provider, model, _), result in zip(jobs, asyncio.run(run())):
+        if isinstance(result, Exception):
+            print(f"❌ {provider}/{model}: {result}")
+        else:
+            print(f"✅ {provider}/{model}: {len(result.get('text', ''))} 字符")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+stt_pipeline 共用的例外類別
+"""
+
+
+class TranscriptionError(Exception):
+    """供應商回傳非 2xx 或轉錄任務失敗"""
+
+    def __init__(self, provider, message, status_code=None, body=None, retry_after=None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status_code = status_code
+        self.body = body
+        self.retry_after = retry_after
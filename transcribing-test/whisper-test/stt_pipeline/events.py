@@ -0,0 +1,29 @@
+"""
+音效事件軌
+ElevenLabs 的 audio_event（笑聲、掌聲、背景音樂）在轉換時間軸的同一次走訪中分流，
+字幕與事件軌一起產生，編輯器不必再解析一次供應商 JSON 就能放置音效字幕
+"""
+
+from .segment_dp import segment_dp
+from .speakers import build_speaker_cues
+from .timeline import from_provider
+
+
+def cues_with_events(provider, result, params=None, speakers=False):
+    """
+    回傳 (cues, events)
+    events 為 AudioEvent 清單（start / end 毫秒、原始文字、speaker、去掉括號的 label）；
+    speakers=True 時字幕依說話者斷開（見 speakers.build_speaker_cues）
+    """
+    events = []
+    timeline = from_provider(provider, result, event_track=events)
+    cues = build_speaker_cues(timeline, params) if speakers else segment_dp(timeline, params)
+    return cues, events
+
+
+def events_to_dicts(events):
+    """轉成 JSON 友善的 dict 清單（毫秒），供編輯器放置音效字幕"""
+    return [
+        {"start": e.start, "end": e.end, "label": e.label, "text": e.text, "speaker": e.speaker}
+        for e in events
+    ]
@@ -0,0 +1,109 @@
+"""
+跨供應商對沖請求
+同一音檔同時送給多個供應商，取第一個通過驗收條件的結果並取消其他請求，
+用來壓低偶發慢回應造成的尾端延遲
+"""
+
+import asyncio
+import time
+
+from .sweep import read_audio_once
+
+# 預設對沖組合：Groq whisper-large-v3（詞彙級）對上 ElevenLabs scribe_v1
+DEFAULT_CONTENDERS = [
+    ("groq", "whisper-large-v3", {"language": "zh", "timestamp_granularities": ["word", "segment"]}),
+    ("elevenlabs", "scribe_v1", {}),
+]
+
+
+def has_word_timestamps(result):
+    words = result.get("words") or []
+    return any(
+        isinstance(w, dict) and w.get("start") is not None and w.get("end") is not None
+        for w in words
+    )
+
+
+def acceptance_check(require_word_timestamps=True, min_text_length=1):
+    """建立驗收條件：需有詞彙級時間戳記、文字長度至少 min_text_length"""
+
+    def check(result):
+        if len(result.get("text", "").strip()) < min_text_length:
+            return False
+        if require_word_timestamps and not has_word_timestamps(result):
+            return False
+        return True
+
+    return check
+
+
+async def race(engine, audio, contenders=None, accept=None, stagger=0.0, timeout=None):
+    """
+    對沖轉錄
+    contenders 為 (provider, model, options) 清單；stagger > 0 時第 n 個請求延後 n × stagger 秒才送出
+    （前面的請求先回來就不必送出，節省額度）
+
+    回傳 dict：provider, model, result, latency, attempts
+    attempts 記錄每個請求的結局（won / rejected / late / error / cancelled）
+    全部失敗或被拒絕時 result 為 None
+    """
+    contenders = list(contenders or DEFAULT_CONTENDERS)
+    accept = accept or acceptance_check()
+    buffer = await asyncio.to_thread(read_audio_once, audio)
+    start_time = time.perf_counter()
+
+    attempts = [
+        {"provider": provider, "model": model, "outcome": "cancelled", "latency": None}
+        for provider, model, _ in contenders
+    ]
+
+    async def run(index, provider, model, options):
+        if stagger:
+            await asyncio.sleep(index * stagger)
+        result = await engine.transcribe(buffer, provider, model, options)
+        return index, result
+
+    tasks = {
+        asyncio.ensure_future(run(i, *contender)): i
+        for i, contender in enumerate(contenders)
+    }
+    winner = None
+    try:
+        pending = set(tasks)
+        deadline = None if timeout is None else start_time + timeout
+        while pending and winner is None:
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                attempt = attempts[tasks[task]]
+                attempt["latency"] = time.perf_counter() - start_time
+                if task.exception() is not None:
+                    attempt["outcome"] = "error"
+                    attempt["error"] = str(task.exception())
+                    continue
+                index, result = task.result()
+                if winner is not None:
+                    attempt["outcome"] = "late"
+                elif accept(result):
+                    attempt["outcome"] = "won"
+                    winner = (index, result)
+                else:
+                    attempt["outcome"] = "rejected"
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if winner is None:
+        return {"provider": None, "model": None, "result": None,
+                "latency": time.perf_counter() - start_time, "attempts": attempts}
+
+    index, result = winner
+    provider, model, _ = contenders[index]
+    return {"provider": provider, "model": model, "result": result,
+            "latency": attempts[index]["latency"], "attempts": attempts}
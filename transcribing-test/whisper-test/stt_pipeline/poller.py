@@ -0,0 +1,230 @@
+"""
+AssemblyAI 多工輪詢器
+在同一個事件迴圈中追蹤多個 transcript id，依音檔長度與歷史完成時間調整輪詢間隔，
+取代每個任務各自 time.sleep(3) 的阻塞輪詢
+"""
+
+import asyncio
+import heapq
+import json
+import time
+from pathlib import Path
+
+import httpx
+
+from .errors import TranscriptionError
+
+# 輪詢時遇到這些狀態碼代表伺服器暫時無法回應，任務本身仍在處理中
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class AssemblyAIPoller:
+    """
+    多工輪詢器
+
+    每個任務預估完成時間 = overhead + ratio × audio_duration：
+    - 離預估還遠時只做稀疏的確認輪詢（最長 max_interval）
+    - 預估前 near_interval 秒內直接睡到預估時間；超過預估後從 min_interval 開始，
+      以 backoff 倍率放寬，但不超過 near_interval（舊版固定 3 秒，完成後最晚不會比舊版晚發現）
+    - 每個完成的任務都會更新 ratio / overhead（指數移動平均），完成時間取最後一次
+      「處理中」與「completed」兩次輪詢的中點，不把輪詢間隔造成的偵測延遲算進去
+    - 查詢本身失敗（429、5xx、連線中斷）不代表任務失敗：依 Retry-After 或退避時間重排，
+      連續失敗超過 max_poll_errors 次才放棄
+    """
+
+    def __init__(self, engine, min_interval=0.5, max_interval=10.0, near_interval=3.0, backoff=1.5,
+                 ratio=0.3, overhead=3.0, smoothing=0.3, history_path=None, max_poll_errors=5):
+        self.engine = engine
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.near_interval = near_interval
+        self.backoff = backoff
+        self.ratio = ratio
+        self.overhead = overhead
+        self.smoothing = smoothing
+        self.history_path = Path(history_path) if history_path else None
+        self.max_poll_errors = max_poll_errors
+
+        self._jobs = {}
+        self._heap = []
+        self._wakeup = None
+        self._driver = None
+        self._tasks = set()
+        self._loop = None
+        self._load_history()
+
+    @property
+    def pending(self):
+        """尚未完成的任務數量"""
+        return len(self._jobs)
+
+    def _load_history(self):
+        if self.history_path and self.history_path.exists():
+            history = json.loads(self.history_path.read_text(encoding="utf-8"))
+            self.ratio = history.get("ratio", self.ratio)
+            self.overhead = history.get("overhead", self.overhead)
+
+    def _save_history(self):
+        if self.history_path:
+            self.history_path.write_text(
+                json.dumps({"ratio": self.ratio, "overhead": self.overhead}),
+                encoding="utf-8",
+            )
+
+    def expected_duration(self, audio_duration):
+        """預估處理秒數；音檔長度未知時只用固定開銷"""
+        if not audio_duration:
+            return self.overhead
+        return self.overhead + self.ratio * audio_duration
+
+    def next_delay(self, job, now):
+        """計算下一次輪詢前要等待的秒數"""
+        elapsed = now - job["started"]
+        remaining = self.expected_duration(job["audio_duration"]) - elapsed
+        if remaining > self.near_interval:
+            # 離預估還遠：稀疏輪詢，最晚在預估前 near_interval 秒醒來
+            return max(min(remaining - self.near_interval, self.max_interval), self.min_interval)
+        if remaining > self.min_interval:
+            # 接近預估：直接睡到預估時間
+            return remaining
+
+        # 已超過預估：從 min_interval 開始逐次放寬，上限 near_interval
+        delay = self.min_interval * (self.backoff ** job["overdue_polls"])
+        job["overdue_polls"] += 1
+        return min(delay, self.near_interval)
+
+    @staticmethod
+    def is_retryable(error):
+        """暫時性的查詢錯誤：可重試的 HTTP 狀態碼或連線層錯誤"""
+        if isinstance(error, TranscriptionError):
+            return error.status_code in RETRYABLE_STATUS
+        return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+    def retry_delay(self, job, error):
+        """查詢失敗後的等待秒數；不可重試或已達上限時回傳 None"""
+        if not self.is_retryable(error) or job["poll_errors"] >= self.max_poll_errors:
+            return None
+        delay = min(self.min_interval * (self.backoff ** job["poll_errors"]), self.max_interval)
+        job["poll_errors"] += 1
+        retry_after = getattr(error, "retry_after", None)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def record_completion(self, audio_duration, elapsed):
+        """用實際完成時間更新預估參數"""
+        alpha = self.smoothing
+        if audio_duration:
+            observed_ratio = max(elapsed - self.overhead, 0.0) / audio_duration
+            self.ratio = (1 - alpha) * self.ratio + alpha * observed_ratio
+        else:
+            self.overhead = (1 - alpha) * self.overhead + alpha * elapsed
+        self._save_history()
+
+    def wait(self, transcript_id, audio_duration=None, started=None, api_key=None):
+        """
+        登記一個任務並回傳 Future，任務 completed 時得到完整結果 dict
+        started 為任務送出的 time.monotonic()，預設為現在；api_key 為建立任務的金鑰
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 驅動迴圈與 Future 綁定事件迴圈；舊迴圈已結束，上面的任務無人等待
+            self._loop = loop
+            self._jobs = {}
+            self._heap = []
+            self._wakeup = None
+            self._driver = None
+            self._tasks = set()
+        if transcript_id in self._jobs:
+            return self._jobs[transcript_id]["future"]
+
+        now = time.monotonic()
+        job = {
+            "id": transcript_id,
+            "future": loop.create_future(),
+            "started": started if started is not None else now,
+            "audio_duration": audio_duration,
+            "overdue_polls": 0,
+            "poll_errors": 0,
+            "last_pending": started if started is not None else now,
+            "api_key": api_key,
+        }
+        self._jobs[transcript_id] = job
+        self._schedule(job, now + self.next_delay(job, now))
+        self._ensure_driver()
+        return job["future"]
+
+    def _schedule(self, job, due):
+        heapq.heappush(self._heap, (due, job["id"]))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_driver(self):
+        if self._driver is None or self._driver.done():
+            self._wakeup = asyncio.Event()
+            self._driver = asyncio.create_task(self._drive())
+
+    async def _drive(self):
+        """單一驅動迴圈：睡到最早到期的任務，批次送出所有到期的查詢"""
+        while self._jobs:
+            now = time.monotonic()
+            due_ids = []
+            while self._heap and self._heap[0][0] <= now:
+                _, transcript_id = heapq.heappop(self._heap)
+                job = self._jobs.get(transcript_id)
+                if job is None:
+                    continue
+                # 等待端已取消（例如對沖請求輸了），不再輪詢
+                if job["future"].done():
+                    del self._jobs[transcript_id]
+                    continue
+                due_ids.append(transcript_id)
+
+            for transcript_id in due_ids:
+                task = asyncio.create_task(self._poll(self._jobs[transcript_id]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, job):
+        try:
+            result = await self.engine.fetch_assemblyai(job["id"], job["api_key"])
+        except Exception as e:
+            delay = self.retry_delay(job, e)
+            if delay is None:
+                self._finish(job, error=e)
+            else:
+                self._schedule(job, time.monotonic() + delay)
+            return
+
+        job["poll_errors"] = 0
+        status = result.get("status")
+        now = time.monotonic()
+        if status == "completed":
+            # 實際完成落在最後一次「處理中」與這次輪詢之間，取中點
+            finished = (job["last_pending"] + now) / 2
+            self.record_completion(result.get("audio_duration"), finished - job["started"])
+            self._finish(job, result=result)
+        elif status == "error":
+            self._finish(job, error=TranscriptionError("assemblyai", result.get("error", "Unknown error")))
+        else:
+            # 處理中的回應通常已帶有 audio_duration，可用來修正預估
+            if result.get("audio_duration") and not job["audio_duration"]:
+                job["audio_duration"] = result["audio_duration"]
+            job["last_pending"] = now
+            self._schedule(job, now + self.next_delay(job, now))
+
+    def _finish(self, job, result=None, error=None):
+        self._jobs.pop(job["id"], None)
+        future = job["future"]
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        if self._wakeup is not None:
+            self._wakeup.set()
@@ -0,0 +1,193 @@
+"""
+並行 Prompt 搜尋
+候選 Prompt 分批並行送出，用段落長度分析評分，
+分數連續幾批沒有進步就提前停止，最佳 Prompt 依模型保存下來供下一輪直接沿用
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from .engine import TranscriptionEngine
+
+DEFAULT_STORE_PATH = "best_prompts.json"
+
+# 沿用 groq_iterative_test_round*.py 的段落長度分級
+IDEAL_MIN_LENGTH = 15
+LONG_LENGTH = 30
+VERY_LONG_LENGTH = 40
+
+
+def analyze_segment_lengths(texts):
+    """
+    段落長度分析：>40 嚴重過長、>30 過長、15~30 理想、<15 過短
+    score = 理想比例 − 過長比例 − 2 × 嚴重過長比例 − 0.5 × 過短比例
+    """
+    lengths = [len(text.strip()) for text in texts if text.strip()]
+    if not lengths:
+        return {"total_segments": 0, "score": float("-inf")}
+
+    very_long = sum(1 for n in lengths if n > VERY_LONG_LENGTH)
+    long = sum(1 for n in lengths if LONG_LENGTH < n <= VERY_LONG_LENGTH)
+    ideal = sum(1 for n in lengths if IDEAL_MIN_LENGTH <= n <= LONG_LENGTH)
+    short = len(lengths) - very_long - long - ideal
+    total = len(lengths)
+
+    return {
+        "total_segments": total,
+        "avg_length": sum(lengths) / total,
+        "max_length": max(lengths),
+        "very_long_count": very_long,
+        "problem_count": very_long + long,
+        "ideal_count": ideal,
+        "short_count": short,
+        "score": (ideal - long - 2 * very_long - 0.5 * short) / total,
+    }
+
+
+def segment_texts(result):
+    """取出段落文字；沒有段落時把整段文字當成一個段落"""
+    segments = result.get("segments") or []
+    if segments:
+        return [seg.get("text", "") for seg in segments]
+    return [result.get("text", "")]
+
+
+class PromptStore:
+    """每個「供應商:模型」保存一個目前最佳的 Prompt"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = Path(path)
+
+    def load(self):
+        if not self.path.exists():
+            return {}
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def best(self, provider, model):
+        return self.load().get(f"{provider}:{model}")
+
+    def update(self, provider, model, candidate):
+        """分數比已保存的更好才寫入，回傳是否有更新"""
+        entries = self.load()
+        key = f"{provider}:{model}"
+        current = entries.get(key)
+        if current and current["score"] >= candidate["score"]:
+            return False
+        entries[key] = {
+            "name": candidate["name"],
+            "prompt": candidate["prompt"],
+            "score": candidate["score"],
+            "analysis": candidate["analysis"],
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.path.write_text(json.dumps(entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        return True
+
+
+class PromptSearch:
+    """
+    Prompt 搜尋
+    candidates 為 (名稱, prompt) 序列，依 batch_size 分批並行評估；
+    連續 patience 批的最佳分數進步都小於 min_improvement 即停止；
+    連續 max_failed_batches 批全部出錯（供應商故障、金鑰失效）也停止，不再耗用額度
+    """
+
+    def __init__(self, engine, audio, provider, model, options=None, store=None,
+                 batch_size=4, patience=2, min_improvement=0.01, scorer=None, max_failed_batches=2):
+        self.engine = engine
+        self.audio = audio
+        self.provider = provider
+        self.model = model
+        self.options = dict(options or {"language": "zh", "response_format": "verbose_json"})
+        self.store = store if store is not None else PromptStore()
+        self.batch_size = batch_size
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.max_failed_batches = max_failed_batches
+        self.scorer = scorer or (lambda result: analyze_segment_lengths(segment_texts(result)))
+        self.history = []
+
+    async def evaluate(self, name, prompt):
+        options = dict(self.options)
+        if prompt:
+            options["prompt"] = prompt
+        start_time = time.perf_counter()
+        try:
+            result = await self.engine.transcribe(self.audio, self.provider, self.model, options)
+        except Exception as e:
+            return {"name": name, "prompt": prompt, "score": float("-inf"), "analysis": {},
+                    "latency": time.perf_counter() - start_time, "error": str(e)}
+
+        analysis = self.scorer(result)
+        return {"name": name, "prompt": prompt, "score": analysis["score"], "analysis": analysis,
+                "latency": time.perf_counter() - start_time, "error": None}
+
+    async def run(self, candidates):
+        """回傳最佳候選 dict；前一輪保存的最佳 Prompt 會先加入比較"""
+        if isinstance(self.audio, (str, Path)):
+            path = Path(self.audio)
+            self.audio = (path.name, await asyncio.to_thread(path.read_bytes))
+
+        queue = list(candidates)
+        stored = self.store.best(self.provider, self.model)
+        if stored and all(prompt != stored["prompt"] for _, prompt in queue):
+            queue.insert(0, (f"{stored['name']} (已保存)", stored["prompt"]))
+
+        best = None
+        stale_batches = 0
+        failed_batches = 0
+        for offset in range(0, len(queue), self.batch_size):
+            batch = queue[offset:offset + self.batch_size]
+            results = await asyncio.gather(*(self.evaluate(name, prompt) for name, prompt in batch))
+            self.history.extend(results)
+
+            if all(r["error"] is not None for r in results):
+                failed_batches += 1
+                if failed_batches >= self.max_failed_batches:
+                    break
+                continue
+            failed_batches = 0
+
+            batch_best = max(results, key=lambda r: r["score"])
+            if best is None or batch_best["score"] >= best["score"] + self.min_improvement:
+                best = batch_best
+                stale_batches = 0
+            else:
+                if batch_best["score"] > best["score"]:
+                    best = batch_best
+                stale_batches += 1
+                if stale_batches >= self.patience:
+                    break
+
+        if best is not None and best["error"] is None:
+            self.store.update(self.provider, self.model, best)
+        return best
+
+
+def main():
+    """範例：把 groq_iterative_test_round1.py 的候選 Prompt 改用並行搜尋"""
+    candidates = [
+        ("基準測試", ""),
+        ("嚴格長度控制", "財經新聞轉錄。每個段落最多 25 個字符，必須在句號、問號處分段。"),
+        ("標點符號分段", "轉錄財經新聞為字幕。遇到句號、問號、感嘆號立即分段，使用繁體中文。"),
+        ("防止合併策略", "財經新聞字幕轉錄。禁止將多個完整句子合併在一個段落，段落長度上限 25 字符。"),
+        ("保守微調", "這是一段財經新聞。"),
+    ]
+
+    async def run():
+        async with TranscriptionEngine() as engine:
+            search = PromptSearch(engine, "test_audio.mp3", "groq", "whisper-large-v3")
+            best = await search.run(candidates)
+            return search, best
+
+    search, best = asyncio.run(run())
+    for entry in search.history:
+        print(f"  {entry['name']}: score={entry['score']:.3f} ({entry['latency']:.2f}s)")
+    if best:
+        print(f"\n🏆 最佳 Prompt: {best['name']} (score={best['score']:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+字幕品質評分
+取代 evaluate_srt_quality、analyze_real_srt_quality、precise_quality_comparison、
+fair_quality_assessment、analyze_segments、analyze_srt_readability 各自解析 SRT、
+各自寫死 15 / 25 / 30 / 40 門檻的做法：一次走訪 Cue 就算出長度直方圖、
+寬度 / 時長 / 每秒字數分布、問題段落索引與依評分設定加權的總分
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field, replace
+
+from .cues import Cue
+from .subtitle_io import iter_cues
+from .width import display_width
+
+DEFAULT_WEIGHTS = {
+    "ideal": 30.0,          # 長度落在理想區間的比例
+    "acceptable": 20.0,     # 長度落在可接受區間的比例
+    "no_long": 30.0,        # 沒有過長段落（過長扣一次、嚴重過長再扣一次）
+    "reading_speed": 10.0,  # 每秒字數不超過上限的比例
+    "duration": 10.0,       # 時長落在上下限內的比例
+    "width": 10.0,          # 顯示寬度不超過 max_width 的比例（只在設定 max_width 時計分）
+}
+# 總分以實際計分項目的權重和正規化：設定 max_width 時其他項目依比例讓出 width 的份量
+
+
+@dataclass(frozen=True)
+class ScoreProfile:
+    """評分設定：長度門檻（字數）、寬度 / 時長 / 閱讀速度上限與各項權重"""
+    name: str = "default"
+    ideal_min: int = 15
+    ideal_max: int = 30
+    acceptable_min: int = 10
+    acceptable_max: int = 40
+    long_length: int = 30
+    very_long_length: int = 40      # 0 代表不分級，過長只扣一次
+    max_width: int = 0              # 0 代表不檢查顯示寬度
+    min_duration_ms: int = 700
+    max_duration_ms: int = 7000
+    max_cps: float = 9.0            # 中文字幕每秒字數上限
+    weights: dict = field(default_factory=lambda: dict(DEFAULT_WEIGHTS), hash=False)
+
+
+# 各舊腳本的門檻整理成預設設定
+PROFILES = {
+    "default": ScoreProfile(),
+    # complete_model_comparison.evaluate_srt_quality：理想 15–30、可接受 10–40、過長 >40
+    "model_comparison": ScoreProfile(name="model_comparison", long_length=40, very_long_length=0),
+    # professional_model_test.analyze_srt_readability：理想 15–35、過短 <10、過長 >40
+    "readability": ScoreProfile(name="readability", ideal_max=35, long_length=40, very_long_length=0),
+    # precise_word_level_test.precise_quality_comparison：理想 15–25、問題 >30、嚴重 >40
+    "precise": ScoreProfile(name="precise", ideal_max=25),
+    # complete_segment_vs_word_analysis.analyze_segments：長段落 >25、超長 >35
+    "segments": ScoreProfile(name="segments", ideal_max=25, acceptable_max=35,
+                             long_length=25, very_long_length=35),
+    # 編輯器字幕預設（18 字、n8n 的顯示寬度）
+    "editor": ScoreProfile(name="editor", ideal_min=10, ideal_max=18, acceptable_min=6,
+                           acceptable_max=20, long_length=18, very_long_length=25, max_width=36),
+}
+
+
+@dataclass
+class SubtitleScore:
+    """評分結果；problems 為 {問題類型: [段落索引, ...]}"""
+    profile: str
+    count: int = 0
+    score: float = 0.0
+    components: dict = field(default_factory=dict)
+    length_histogram: Counter = field(default_factory=Counter)
+    width_histogram: Counter = field(default_factory=Counter)
+    duration_histogram: Counter = field(default_factory=Counter)   # 以 100 ms 為一格
+    cps_histogram: Counter = field(default_factory=Counter)        # 以 1 字/秒為一格
+    total_length: int = 0
+    total_duration_ms: int = 0
+    min_length: int = 0
+    max_length: int = 0
+    max_width: int = 0
+    ideal_count: int = 0
+    acceptable_count: int = 0
+    problems: dict = field(default_factory=dict)
+
+    @property
+    def avg_length(self):
+        return self.total_length / self.count if self.count else 0.0
+
+    @property
+    def avg_duration_ms(self):
+        return self.total_duration_ms / self.count if self.count else 0.0
+
+    def percentile(self, name, q):
+        """從直方圖取百分位數，name 為 length / width / duration / cps"""
+        histogram = getattr(self, f"{name}_histogram")
+        target = q * self.count
+        seen = 0
+        for value in sorted(histogram):
+            seen += histogram[value]
+            if seen >= target:
+                return value
+        return 0
+
+    def problem_count(self, kind):
+        return len(self.problems.get(kind, ()))
+
+    def to_dict(self):
+        return {
+            "profile": self.profile,
+            "count": self.count,
+            "score": round(self.score, 2),
+            "components": {k: round(v, 4) for k, v in self.components.items()},
+            "avg_length": round(self.avg_length, 2),
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+            "max_width": self.max_width,
+            "avg_duration_ms": round(self.avg_duration_ms, 1),
+            "ideal_count": self.ideal_count,
+            "acceptable_count": self.acceptable_count,
+            "problems": {k: len(v) for k, v in self.problems.items()},
+        }
+
+
+PROBLEM_KINDS = ("too_short", "long", "very_long", "too_wide", "too_fast", "too_brief", "too_long_duration")
+
+
+def score_cues(cues, profile="default"):
+    """
+    單次走訪 Cue（任何 iterable，包含 iter_cues 的產生器）計算所有統計與總分
+    長度以去掉前後空白的字數計，寬度以 display_width 計
+    """
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    result = SubtitleScore(profile=profile.name)
+    problems = {kind: [] for kind in PROBLEM_KINDS}
+    length_histogram = result.length_histogram
+    width_histogram = result.width_histogram
+    duration_histogram = result.duration_histogram
+    cps_histogram = result.cps_histogram
+
+    ideal_min, ideal_max = profile.ideal_min, profile.ideal_max
+    acceptable_min, acceptable_max = profile.acceptable_min, profile.acceptable_max
+    long_length, very_long_length = profile.long_length, profile.very_long_length
+    width_limit = profile.max_width
+    min_duration, max_duration = profile.min_duration_ms, profile.max_duration_ms
+    max_cps = profile.max_cps
+
+    count = total_length = total_duration = 0
+    ideal = acceptable = 0
+    min_length = None
+    max_length = max_width = 0
+
+    for index, cue in enumerate(cues):
+        text = cue.text.strip()
+        length = len(text)
+        width = length if text.isascii() else display_width(text)
+        duration = cue.end - cue.start
+
+        count += 1
+        total_length += length
+        total_duration += duration
+        length_histogram[length] += 1
+        width_histogram[width] += 1
+        duration_histogram[duration // 100] += 1
+        if min_length is None or length < min_length:
+            min_length = length
+        if length > max_length:
+            max_length = length
+        if width > max_width:
+            max_width = width
+
+        if ideal_min <= length <= ideal_max:
+            ideal += 1
+        if acceptable_min <= length <= acceptable_max:
+            acceptable += 1
+        elif length < acceptable_min:
+            problems["too_short"].append(index)
+        if length > long_length:
+            problems["long"].append(index)
+        if very_long_length and length > very_long_length:
+            problems["very_long"].append(index)
+        if width_limit and width > width_limit:
+            problems["too_wide"].append(index)
+
+        if duration > 0:
+            cps = length * 1000 / duration
+            cps_histogram[int(cps)] += 1
+            if cps > max_cps:
+                problems["too_fast"].append(index)
+        if duration < min_duration:
+            problems["too_brief"].append(index)
+        elif duration > max_duration:
+            problems["too_long_duration"].append(index)
+
+    result.count = count
+    result.total_length = total_length
+    result.total_duration_ms = total_duration
+    result.min_length = min_length or 0
+    result.max_length = max_length
+    result.max_width = max_width
+    result.ideal_count = ideal
+    result.acceptable_count = acceptable
+    result.problems = {kind: indices for kind, indices in problems.items() if indices}
+    if not count:
+        return result
+
+    long_hits = len(problems["long"]) + len(problems["very_long"])
+    components = {
+        "ideal": ideal / count,
+        "acceptable": acceptable / count,
+        "no_long": max(0.0, 1 - long_hits / count),
+        "reading_speed": 1 - len(problems["too_fast"]) / count,
+        "duration": 1 - (len(problems["too_brief"]) + len(problems["too_long_duration"])) / count,
+    }
+    if width_limit:
+        components["width"] = 1 - len(problems["too_wide"]) / count
+    weights = profile.weights
+    total_weight = sum(weights.get(name, 0) for name in components) or 1
+    result.components = components
+    result.score = 100 * sum(weights.get(name, 0) * value for name, value in components.items()) / total_weight
+    return result
+
+
+def score_srt(source, profile="default"):
+    """直接對 SRT / WebVTT 檔案（路徑、bytes 或字串）評分；解析與統計同一次走訪完成"""
+    return score_cues(iter_cues(source), profile)
+
+
+def score_texts(texts, profile="default"):
+    """只有段落文字（沒有時間）時的長度評分；時長相關項目不列入總分"""
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    weights = {k: v for k, v in profile.weights.items() if k not in ("reading_speed", "duration")}
+    no_timing = replace(profile, weights=weights, min_duration_ms=0,
+                        max_duration_ms=float("inf"), max_cps=float("inf"))
+    return score_cues((Cue(0, 0, text) for text in texts), no_timing)
@@ -0,0 +1,153 @@
+"""
+每個 API 金鑰一個 token bucket 的排程器
+在多把金鑰之間輪替工作，遇到 429 依 Retry-After 暫停該金鑰，
+並提供目前排隊中的請求數，讓批次任務用滿額度又不觸發限流
+"""
+
+import asyncio
+import os
+import time
+from email.utils import parsedate_to_datetime
+
+
+def keys_from_env(env_key):
+    """
+    讀取 ASSEMBLYAI_API_KEY、ASSEMBLYAI_API_KEY_2、ASSEMBLYAI_API_KEY_3… 直到缺號為止
+    """
+    keys = []
+    value = os.getenv(env_key)
+    if value:
+        keys.append(value)
+    index = 2
+    while True:
+        value = os.getenv(f"{env_key}_{index}")
+        if not value:
+            break
+        keys.append(value)
+        index += 1
+    return keys
+
+
+class TokenBucket:
+    """
+    token bucket：每秒補充 rate 個 token，最多累積 capacity 個
+    rate 為 None 時不限速
+    """
+
+    def __init__(self, rate=None, capacity=1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if self.rate is None:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available_at(self, now):
+        """下一個 token 可用的時間點"""
+        if self.rate is None:
+            return now
+        self._refill(now)
+        if self.tokens >= 1:
+            return now
+        return now + (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        if self.rate is None:
+            return
+        self._refill(now)
+        self.tokens -= 1
+
+
+class KeyScheduler:
+    """
+    多金鑰排程器
+
+        key = await scheduler.acquire()
+        try:
+            ...  # 用 key 送出請求
+        except 429:
+            scheduler.penalize(key, retry_after)
+        finally:
+            scheduler.release(key)
+
+    acquire() 依 FIFO 排隊，選擇目前可用（有 token、未在冷卻）且進行中請求最少的金鑰
+    """
+
+    def __init__(self, keys, rate=None, burst=1, default_retry_after=5.0):
+        if not keys:
+            raise ValueError("至少需要一把 API 金鑰")
+        self.keys = list(keys)
+        self.buckets = {key: TokenBucket(rate, burst) for key in self.keys}
+        self.cooldown_until = {key: 0.0 for key in self.keys}
+        self.in_flight = {key: 0 for key in self.keys}
+        self.default_retry_after = default_retry_after
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def queue_depth(self):
+        """排隊等待金鑰的請求數"""
+        return self.waiting
+
+    def stats(self):
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": sum(self.in_flight.values()),
+            "keys": [
+                {
+                    "key": f"{key[:6]}…",
+                    "in_flight": self.in_flight[key],
+                    "cooling_down": self.cooldown_until[key] > time.monotonic(),
+                }
+                for key in self.keys
+            ],
+        }
+
+    def _ready_at(self, key, now):
+        return max(self.buckets[key].available_at(now), self.cooldown_until[key])
+
+    async def acquire(self):
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    ready = [key for key in self.keys if self._ready_at(key, now) <= now]
+                    if ready:
+                        key = min(ready, key=lambda k: self.in_flight[k])
+                        self.buckets[key].take(now)
+                        self.in_flight[key] += 1
+                        return key
+                    earliest = min(self._ready_at(key, now) for key in self.keys)
+                    await asyncio.sleep(max(earliest - now, 0.001))
+        finally:
+            self.waiting -= 1
+
+    def release(self, key):
+        self.in_flight[key] = max(self.in_flight[key] - 1, 0)
+
+    def penalize(self, key, retry_after=None):
+        """收到 429 時暫停該金鑰 retry_after 秒，並清空它的 token"""
+        delay = retry_after if retry_after is not None else self.default_retry_after
+        self.cooldown_until[key] = max(self.cooldown_until[key], time.monotonic() + delay)
+        bucket = self.buckets[key]
+        if bucket.rate is not None:
+            bucket.tokens = min(bucket.tokens, 0.0)
+
+
+def parse_retry_after(value):
+    """Retry-After 可能是秒數或 HTTP 日期；無法解析時回傳 None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+本機回放伺服器
+模擬 ElevenLabs /v1/speech-to-text、AssemblyAI /v2/upload + /v2/transcript、
+OpenAI 相容 /audio/transcriptions，回傳目錄中已錄製的 JSON 結果，
+可設定注入延遲與錯誤率，不需網路與 API key 就能壓測整條管線
+
+用法：
+    python -m stt_pipeline.replay_server --port 8765 --latency 0.5 --error-rate 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .timecode import format_timestamps
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent
+
+# 各端點預設回放的錄製結果
+DEFAULT_FIXTURES = {
+    "elevenlabs": "elevenlabs_scribe_v1_result.json",
+    "elevenlabs:scribe_v1_experimental": "elevenlabs_scribe_v1_experimental_result.json",
+    "assemblyai": "assemblyai_chinese_result.json",
+    "openai": "groq_transcription_complete.json",
+}
+
+
+class ReplayConfig:
+    """注入延遲與錯誤的設定"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500,
+                 processing_ratio=0.1, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # AssemblyAI 任務完成所需時間 = processing_ratio × audio_duration
+        self.processing_ratio = processing_ratio
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(self.latency + jitter, 0.0)
+
+    def should_fail(self):
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+def load_fixtures(directory=FIXTURES_DIR, names=None):
+    fixtures = {}
+    for key, filename in {**DEFAULT_FIXTURES, **(names or {})}.items():
+        path = Path(directory) / filename
+        if path.exists():
+            fixtures[key] = json.loads(path.read_text(encoding="utf-8"))
+    return fixtures
+
+
+def words_from_elevenlabs(result):
+    """錄製的 Groq 結果沒有詞彙級時間戳記，以 ElevenLabs 的詞彙補上"""
+    return [
+        {"word": w["text"], "start": w["start"], "end": w["end"]}
+        for w in result.get("words", [])
+        if w.get("type") == "word"
+    ]
+
+
+def format_srt(segments, separator=","):
+    stamps = format_timestamps((t for seg in segments for t in (seg["start"], seg["end"])),
+                               separator, unit="s")
+    lines = []
+    for i, seg in enumerate(segments):
+        lines.append(f"{i + 1}\n{stamps[2 * i]} --> {stamps[2 * i + 1]}\n{seg['text'].strip()}\n")
+    return "\n".join(lines)
+
+
+def format_vtt(segments):
+    """WebVTT：時間戳記直接以 "." 分隔毫秒，段落文字中的逗號不受影響"""
+    return "WEBVTT\n\n" + format_srt(segments, ".")
+
+
+class ReplayState:
+    """伺服器共用狀態：錄製結果、上傳檔案、轉錄任務"""
+
+    def __init__(self, fixtures, config):
+        self.fixtures = fixtures
+        self.config = config
+        self.uploads = {}
+        self.transcripts = {}
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ReplayServer/1.0"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def read_body(self):
+        """讀取請求內容，支援 chunked transfer（串流上傳）"""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def read_form(self, body):
+        """解析 multipart/form-data，回傳文字欄位 dict（同名欄位合併成 list）"""
+        content_type = self.headers.get("Content-Type", "")
+        if not content_type.startswith("multipart/"):
+            return {}
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        form = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if not name or part.get_filename():
+                continue
+            value = part.get_content()
+            if isinstance(value, bytes):
+                value = value.decode("utf-8")
+            if name in form:
+                form[name] = form[name] if isinstance(form[name], list) else [form[name]]
+                form[name].append(value)
+            else:
+                form[name] = value
+        return form
+
+    def send_json(self, status, payload):
+        self.send_text(status, json.dumps(payload, ensure_ascii=False), "application/json")
+
+    def send_text(self, status, text, content_type="text/plain; charset=utf-8"):
+        body = text.encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 用戶端已取消請求（例如對沖請求的輸家）
+            self.close_connection = True
+
+    def inject(self):
+        """套用延遲與錯誤注入；回傳 True 代表已送出錯誤回應"""
+        with self.state.lock:
+            self.state.request_count += 1
+        time.sleep(self.state.config.delay())
+        if self.state.config.should_fail():
+            status = self.state.config.error_status
+            if status == 429:
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self.send_json(status, {"error": "injected failure"})
+            return True
+        return False
+
+    def do_POST(self):
+        body = self.read_body()
+        if self.inject():
+            return
+
+        path = self.path.split("?")[0]
+        if path == "/v1/speech-to-text":
+            self.handle_elevenlabs(body)
+        elif path == "/v2/upload":
+            self.handle_assemblyai_upload(body)
+        elif path == "/v2/transcript":
+            self.handle_assemblyai_submit(body)
+        elif path.endswith("/audio/transcriptions"):
+            self.handle_openai(body)
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {path}"})
+
+    def do_GET(self):
+        if self.inject():
+            return
+
+        match = re.fullmatch(r"/v2/transcript/([\w-]+)", self.path.split("?")[0])
+        if match:
+            self.handle_assemblyai_poll(match.group(1))
+        else:
+            self.send_json(404, {"error": f"unknown endpoint {self.path}"})
+
+    def handle_elevenlabs(self, body):
+        form = self.read_form(body)
+        model_id = form.get("model_id", "scribe_v1")
+        fixtures = self.state.fixtures
+        result = fixtures.get(f"elevenlabs:{model_id}") or fixtures.get("elevenlabs")
+        if result is None:
+            self.send_json(404, {"error": "no elevenlabs fixture"})
+            return
+        self.send_json(200, result)
+
+    def handle_assemblyai_upload(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        with self.state.lock:
+            self.state.uploads[digest] = len(body)
+        host = self.headers.get("Host", "localhost")
+        self.send_json(200, {"upload_url": f"http://{host}/uploads/{digest}"})
+
+    def handle_assemblyai_submit(self, body):
+        request = json.loads(body or b"{}")
+        if "audio_url" not in request:
+            self.send_json(400, {"error": "audio_url is required"})
+            return
+
+        fixture = self.state.fixtures.get("assemblyai", {})
+        audio_duration = fixture.get("audio_duration") or 0
+        transcript_id = str(uuid.uuid4())
+        with self.state.lock:
+            self.state.transcripts[transcript_id] = {
+                "request": request,
+                "ready_at": time.monotonic() + self.state.config.processing_ratio * audio_duration,
+            }
+        self.send_json(200, {"id": transcript_id, "status": "queued", **request})
+
+    def handle_assemblyai_poll(self, transcript_id):
+        job = self.state.transcripts.get(transcript_id)
+        if job is None:
+            self.send_json(404, {"error": "transcript not found"})
+            return
+
+        fixture = self.state.fixtures.get("assemblyai", {})
+        if time.monotonic() < job["ready_at"]:
+            self.send_json(200, {
+                "id": transcript_id,
+                "status": "processing",
+                "audio_duration": fixture.get("audio_duration"),
+            })
+            return
+        self.send_json(200, {**fixture, **job["request"], "id": transcript_id, "status": "completed"})
+
+    def handle_openai(self, body):
+        form = self.read_form(body)
+        result = dict(self.state.fixtures.get("openai", {}))
+        response_format = form.get("response_format", "json")
+        granularities = form.get("timestamp_granularities[]", [])
+        if isinstance(granularities, str):
+            granularities = [granularities]
+
+        if response_format in ("srt", "vtt"):
+            segments = result.get("segments") or []
+            self.send_text(200, format_vtt(segments) if response_format == "vtt" else format_srt(segments))
+        elif response_format == "text":
+            self.send_text(200, result.get("text", ""))
+        elif response_format == "verbose_json":
+            if "word" in granularities and not result.get("words"):
+                result["words"] = words_from_elevenlabs(self.state.fixtures.get("elevenlabs", {}))
+            self.send_json(200, result)
+        else:
+            self.send_json(200, {"text": result.get("text", "")})
+
+
+class ReplayServer:
+    """
+    可在測試程式內啟動的回放伺服器（背景執行緒）
+
+        with ReplayServer(latency=0.2) as server:
+            engine = TranscriptionEngine(api_keys=server.api_keys(), base_urls=server.base_urls())
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fixtures_dir=FIXTURES_DIR,
+                 fixture_names=None, verbose=False, **config):
+        self.state = ReplayState(load_fixtures(fixtures_dir, fixture_names), ReplayConfig(**config))
+        self.httpd = ThreadingHTTPServer((host, port), ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.httpd.verbose = verbose
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_urls(self):
+        """給 TranscriptionEngine(base_urls=...) 使用"""
+        return {
+            "openai": f"{self.url}/v1",
+            "groq": f"{self.url}/openai/v1",
+            "elevenlabs": self.url,
+            "assemblyai": self.url,
+        }
+
+    def api_keys(self):
+        """回放伺服器不檢查金鑰，回傳假金鑰即可"""
+        return {provider: "replay" for provider in self.base_urls()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="語音轉文字 API 本機回放伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures-dir", default=str(FIXTURES_DIR), help="錄製結果 JSON 所在目錄")
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的延遲秒數")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延遲的隨機浮動範圍（±秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入錯誤的機率 0~1")
+    parser.add_argument("--error-status", type=int, default=500, help="注入錯誤的 HTTP 狀態碼")
+    parser.add_argument("--processing-ratio", type=float, default=0.1,
+                        help="AssemblyAI 任務處理時間 = ratio × audio_duration")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        host=args.host, port=args.port, fixtures_dir=args.fixtures_dir, verbose=args.verbose,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, processing_ratio=args.processing_ratio, seed=args.seed,
+    )
+    print(f"🎧 回放伺服器啟動: {server.url}")
+    print(f"   已載入錄製結果: {', '.join(sorted(server.state.fixtures))}")
+    for provider, url in server.base_urls().items():
+        print(f"   {provider}: {url}")
+
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 停止伺服器")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
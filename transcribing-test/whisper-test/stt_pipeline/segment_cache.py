@@ -0,0 +1,138 @@
+"""
+斷句結果快取
+鍵值 = 正規化時間軸的指紋 + 斷句函式（模組.限定名稱 + 版本）+ SegmentParams，
+記憶體內 LRU 為第一層，可選擇以 ResponseCache（gzip JSON）作為磁碟第二層；
+編輯器反覆以同一組預設重新產生字幕時直接取回 Cue 清單
+"""
+
+import hashlib
+import json
+from array import array
+from collections import OrderedDict
+from dataclasses import asdict
+
+from .cache import ResponseCache
+from .cues import Cue
+from .segment_dp import segment_dp, segment_greedy
+
+DEFAULT_SEGMENT_CACHE_DIR = ".segment_cache"
+DEFAULT_MAX_ENTRIES = 256
+
+# 內建斷句函式的版本；演算法改變輸出時遞增，舊的快取就不會再命中
+SEGMENTER_VERSIONS = {segment_dp: 1, segment_greedy: 1}
+
+
+def timeline_fingerprint(timeline):
+    """
+    時間軸內容的 SHA-256：文字緩衝區、位移、起訖時間、類型、說話者
+    信心度不影響斷句，不列入；整數陣列統一轉成 64 位元，跨平台一致
+    """
+    digest = hashlib.sha256()
+    digest.update(timeline.buffer.encode("utf-8"))
+    for values in (timeline.offsets, timeline.starts, timeline.ends, timeline.kinds, timeline.speakers):
+        digest.update(array("q", values).tobytes())
+    digest.update(json.dumps(timeline.speaker_names, ensure_ascii=False, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def segmenter_id(segmenter, version=None):
+    """
+    斷句函式在快取鍵值中的識別："模組.限定名稱@版本"
+    lambda、巢狀函式、functools.partial 等沒有穩定名稱的可呼叫物件不能作為鍵值（ValueError）；
+    內建函式的版本取自 SEGMENTER_VERSIONS，其他函式必須明確傳入 version
+    """
+    module = getattr(segmenter, "__module__", None)
+    qualname = getattr(segmenter, "__qualname__", None)
+    if not module or not qualname or "<" in qualname:
+        raise ValueError(f"斷句函式必須是模組層級的具名函式才能快取: {segmenter!r}")
+    if version is None:
+        version = SEGMENTER_VERSIONS.get(segmenter)
+        if version is None:
+            raise ValueError(f"自訂斷句函式需提供 version（輸出改變時更換）: {module}.{qualname}")
+    return f"{module}.{qualname}@{version}"
+
+
+def segment_key(fingerprint, segmenter, params, version=None):
+    payload = json.dumps(
+        [fingerprint, segmenter_id(segmenter, version), asdict(params) if params else None],
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SegmentCache:
+    """
+    兩層快取
+    - 記憶體：OrderedDict LRU，最多 max_entries 組結果
+    - 磁碟：directory 不為 None 時啟用，沿用 ResponseCache 的 gzip 檔與大小上限淘汰
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, directory=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.disk = None
+        if directory is not None:
+            self.disk = ResponseCache(directory) if max_bytes is None else ResponseCache(directory, max_bytes)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key, cues):
+        self._memory[key] = cues
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """回傳 Cue tuple，沒有則 None"""
+        cues = self._memory.get(key)
+        if cues is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return cues
+        if self.disk is not None:
+            stored = self.disk.get(key)
+            if stored is not None:
+                cues = tuple(Cue(*item) for item in stored)
+                self._remember(key, cues)
+                self.disk_hits += 1
+                return cues
+        self.misses += 1
+        return None
+
+    def put(self, key, cues):
+        cues = tuple(cues)
+        self._remember(key, cues)
+        if self.disk is not None:
+            self.disk.put(key, [list(cue) for cue in cues])
+        return cues
+
+    def segment(self, timeline, params=None, segmenter=segment_dp, fingerprint=None, version=None):
+        """
+        取得斷句結果；未命中時呼叫 segmenter(timeline, params) 並存入快取
+        同一份時間軸重複查詢時可傳入先前算好的 fingerprint；自訂 segmenter 需提供 version
+        """
+        key = segment_key(fingerprint or timeline_fingerprint(timeline), segmenter, params, version)
+        cues = self.get(key)
+        if cues is None:
+            cues = self.put(key, segmenter(timeline, params))
+        return list(cues)
+
+    def clear(self):
+        self._memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_default_cache = None
+
+
+def cached_segment(timeline, params=None, segmenter=segment_dp, version=None):
+    """使用行程內共用的記憶體快取斷句"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SegmentCache()
+    return _default_cache.segment(timeline, params, segmenter, version=version)
@@ -0,0 +1,301 @@
+"""
+全域最佳化的字幕斷句（動態規劃）
+貪婪斷句一超過 max_chars 就切，容易留下很短的孤兒段落，也不理會標點與停頓；
+這裡對整份逐字稿最小化總成本：長度偏離目標、在標點處斷句的獎勵、停頓獎勵、時長限制。
+每個斷點只往回看有限個詞（lookback），複雜度 O(n·k)
+"""
+
+from dataclasses import dataclass, replace
+
+from .cues import Cue
+from .timeline import KIND_WORD
+from .width import width_prefix
+
+SENTENCE_END = frozenset("。！？!?.…")
+CLAUSE_END = frozenset("，、,;；:：")
+
+INFINITY = float("inf")
+DEFAULT_MAX_CHARS = 18
+
+
+@dataclass(frozen=True)
+class SegmentParams:
+    """斷句參數（frozen，可作為快取鍵值）"""
+    max_chars: int | None = None   # None：只設定 max_width 時不限字數，否則為 18
+    max_width: int = 0             # 顯示寬度上限（中文 2、英數 1），0 代表不限制
+    target_chars: int = 0          # 0 代表上限 × 0.8；有 max_width 時依實際文字換算成寬度
+    max_duration_ms: int = 5000
+    min_duration_ms: int = 800
+    length_weight: float = 1.0
+    sentence_bonus: float = 1.0
+    clause_bonus: float = 0.5
+    pause_bonus: float = 0.8
+    pause_cap_ms: int = 600
+    short_penalty: float = 0.5
+    lookback: int = 0              # 0 代表長度上限（每個字至少一個字元、寬度至少 1）
+
+    @property
+    def char_limit(self):
+        """實際的字數上限；只設定 max_width 時由寬度單獨限制"""
+        if self.max_chars is not None:
+            return self.max_chars
+        return INFINITY if self.max_width else DEFAULT_MAX_CHARS
+
+    def target_length(self, char_width=1.0):
+        """
+        理想段落長度；有 max_width 時單位為顯示寬度，
+        target_chars 乘上實際文字每字元的平均寬度 char_width 換算
+        """
+        if self.max_width:
+            if self.target_chars:
+                return max(round(self.target_chars * char_width), 1)
+            return max(int(self.max_width * 0.8), 1)
+        return self.target_chars or max(int(self.char_limit * 0.8), 1)
+
+    @property
+    def max_lookback(self):
+        if self.lookback:
+            return self.lookback
+        if self.max_chars is not None:
+            return self.max_chars
+        return self.max_width or DEFAULT_MAX_CHARS
+
+
+def word_indices(timeline):
+    """只在 word 項目之間斷句；spacing 與 audio_event 不單獨成段"""
+    kinds = timeline.kinds
+    return [i for i in range(len(kinds)) if kinds[i] == KIND_WORD]
+
+
+PUNCTUATION_NONE = 0
+PUNCTUATION_CLAUSE = 1
+PUNCTUATION_SENTENCE = 2
+
+
+class SegmentPlan:
+    """
+    一份時間軸與參數無關的斷句前置計算：
+    每個詞的文字位移、顯示寬度前綴和、起訖時間、斷點的標點種類與停頓長度。
+    同一份時間軸要用多組參數斷句（調參、比較 max_width）時共用這些陣列，只重跑動態規劃
+    """
+
+    def __init__(self, timeline, words=None, widths=None):
+        self.timeline = timeline
+        self.words = word_indices(timeline) if words is None else words
+        offsets, starts, ends = timeline.offsets, timeline.starts, timeline.ends
+        words = self.words
+        # 攤平成 list，內層迴圈只做一次索引
+        self.text_starts = [offsets[i] for i in words]
+        self.text_ends = [offsets[i + 1] for i in words]
+        self.time_starts = [starts[i] for i in words]
+        self.time_ends = [ends[i] for i in words]
+        self._widths = widths
+        self._width_starts = None
+        self._width_ends = None
+        self._char_width = None
+        self._bonus_cache = {}
+
+        # 斷點 b（第 b 個詞之前）：前一個詞結尾的標點種類、與下一個詞的間隔
+        buffer = timeline.buffer
+        self.punctuation = [PUNCTUATION_NONE] * (len(words) + 1)
+        self.gaps = [0] * (len(words) + 1)
+        for b in range(1, len(words)):
+            text_end = self.text_ends[b - 1]
+            last_char = buffer[text_end - 1] if text_end > self.text_starts[b - 1] else ""
+            if last_char in SENTENCE_END:
+                self.punctuation[b] = PUNCTUATION_SENTENCE
+            elif last_char in CLAUSE_END:
+                self.punctuation[b] = PUNCTUATION_CLAUSE
+            self.gaps[b] = max(self.time_starts[b] - self.time_ends[b - 1], 0)
+
+    def __len__(self):
+        return len(self.words)
+
+    def width_bounds(self):
+        """每個詞的寬度前綴和起訖（第一次需要時才計算）"""
+        if self._width_starts is None:
+            if self._widths is None:
+                self._widths = width_prefix(self.timeline)
+            widths = self._widths
+            self._width_starts = [widths[i] for i in self.words]
+            self._width_ends = [widths[i + 1] for i in self.words]
+        return self._width_starts, self._width_ends
+
+    def char_width(self):
+        """詞彙文字每字元的平均顯示寬度（全中文約 2、全英數 1），把 target_chars 換算成寬度用"""
+        if self._char_width is None:
+            width_starts, width_ends = self.width_bounds()
+            chars = sum(end - start for start, end in zip(self.text_starts, self.text_ends))
+            width = sum(end - start for start, end in zip(width_starts, width_ends))
+            self._char_width = width / chars if chars else 1.0
+        return self._char_width
+
+    def bonuses(self, params):
+        """
+        每個斷點的獎勵，bonus[len(words)] 為結尾
+        只依賴標點與停頓的權重，同權重的參數組共用同一份
+        """
+        key = (params.sentence_bonus, params.clause_bonus, params.pause_bonus, params.pause_cap_ms)
+        bonuses = self._bonus_cache.get(key)
+        if bonuses is None:
+            by_kind = (0.0, params.clause_bonus, params.sentence_bonus)
+            pause_scale = params.pause_bonus / params.pause_cap_ms
+            cap = params.pause_cap_ms
+            bonuses = [
+                by_kind[kind] + pause_scale * (gap if gap < cap else cap)
+                for kind, gap in zip(self.punctuation, self.gaps)
+            ]
+            bonuses[-1] = 0.0
+            self._bonus_cache[key] = bonuses
+        return bonuses
+
+    def bounds(self, params=None):
+        """
+        回傳每段的 (a, b)：第 a 個到第 b-1 個詞（words 清單中的位置）
+        best[b] = min(best[a] + cost(a, b))，a 從 b-1 往回最多 lookback 個詞，
+        字數、寬度或時長超過上限就停止往回（單一詞超長時仍允許自成一段）
+        """
+        params = params or SegmentParams()
+        n = len(self.words)
+        if n == 0:
+            return []
+
+        bonuses = self.bonuses(params)
+        text_starts, text_ends = self.text_starts, self.text_ends
+        time_starts, time_ends = self.time_starts, self.time_ends
+        if params.max_width:
+            width_starts, width_ends = self.width_bounds()
+        else:
+            # 不限寬度時以字數作為長度
+            width_starts, width_ends = text_starts, text_ends
+        target = params.target_length(self.char_width() if params.max_width and params.target_chars else 1.0)
+        max_chars = params.char_limit
+        max_width = params.max_width or max_chars
+        max_duration = params.max_duration_ms
+        min_duration = params.min_duration_ms
+        length_weight = params.length_weight / (target * target)
+        short_penalty = params.short_penalty
+        lookback = params.max_lookback
+
+        best = [INFINITY] * (n + 1)
+        back = [0] * (n + 1)
+        best[0] = 0.0
+
+        for b in range(1, n + 1):
+            text_end = text_ends[b - 1]
+            width_end = width_ends[b - 1]
+            cue_end = time_ends[b - 1]
+            bonus = bonuses[b]
+            lowest = max(b - lookback, 0)
+            best_total = INFINITY
+            best_start = b - 1
+            a = b - 1
+            while a >= lowest:
+                length = text_end - text_starts[a]
+                width = width_end - width_starts[a]
+                duration = cue_end - time_starts[a]
+                if (length > max_chars or width > max_width or duration > max_duration) and a < b - 1:
+                    break
+                deviation = width - target
+                total = best[a] + length_weight * deviation * deviation - bonus
+                if duration < min_duration:
+                    total += short_penalty
+                if total < best_total:
+                    best_total = total
+                    best_start = a
+                a -= 1
+            best[b] = best_total
+            back[b] = best_start
+
+        bounds = []
+        b = n
+        while b > 0:
+            a = back[b]
+            bounds.append((a, b))
+            b = a
+        bounds.reverse()
+        return bounds
+
+    def cues(self, params=None):
+        return cues_from_bounds(self.timeline, self.words, self.bounds(params))
+
+    def sweep(self, settings):
+        """對多組 SegmentParams 斷句，回傳與 settings 同順序的 Cue 清單"""
+        return [self.cues(params) for params in settings]
+
+
+def segment_bounds(timeline, params=None, words=None, widths=None):
+    """
+    單次斷句的 (a, b) 清單（見 SegmentPlan.bounds）
+    widths 為 width_prefix(timeline)，未提供且設定了 max_width 時自動計算
+    """
+    return SegmentPlan(timeline, words, widths).bounds(params)
+
+
+def cues_from_bounds(timeline, words, bounds):
+    starts, ends = timeline.starts, timeline.ends
+    return [
+        Cue(starts[words[a]], ends[words[b - 1]], timeline.span_text(words[a], words[b - 1] + 1))
+        for a, b in bounds
+    ]
+
+
+def segment_dp(timeline, params=None, words=None, widths=None):
+    """動態規劃斷句，回傳 Cue 清單（參數見 segment_bounds）"""
+    return SegmentPlan(timeline, words, widths).cues(params)
+
+
+def segment_grid(timeline, max_widths, max_durations_ms, base=None):
+    """
+    一次產生 (max_width, max_duration_ms) 網格上每一組的斷句結果
+    前置計算（位移、寬度前綴和、標點、停頓、斷點獎勵）整份時間軸只做一次；
+    有設定 max_chars 時放寬到不小於 max_width，讓寬度成為實際的長度限制
+    回傳 {(max_width, max_duration_ms): [Cue, ...]}
+    """
+    base = base or SegmentParams()
+    plan = SegmentPlan(timeline)
+    results = {}
+    for max_width in max_widths:
+        for max_duration in max_durations_ms:
+            params = replace(
+                base,
+                max_width=max_width,
+                max_chars=base.max_chars and max(base.max_chars, max_width),
+                max_duration_ms=max_duration,
+            )
+            results[(max_width, max_duration)] = plan.cues(params)
+    return results
+
+
+def segment_greedy(timeline, params=None, words=None, widths=None):
+    """
+    貪婪斷句（比較基準）
+    與 create_custom_srt_from_words / generate_srt_from_words 相同：
+    加入下一個詞會超過 max_chars、max_width 或 max_duration 就切段
+    """
+    params = params or SegmentParams()
+    words = word_indices(timeline) if words is None else words
+    offsets, starts, ends = timeline.offsets, timeline.starts, timeline.ends
+    if params.max_width and widths is None:
+        widths = width_prefix(timeline)
+    max_width = params.max_width
+    max_chars = params.char_limit
+
+    cues = []
+    first = None
+    previous = None
+    for index in words:
+        if first is not None:
+            length = offsets[index + 1] - offsets[first]
+            duration = ends[index] - starts[first]
+            too_wide = max_width and widths[index + 1] - widths[first] > max_width
+            if length > max_chars or too_wide or duration > params.max_duration_ms:
+                cues.append(Cue(starts[first], ends[previous], timeline.span_text(first, previous + 1)))
+                first = None
+        if first is None:
+            first = index
+        previous = index
+
+    if first is not None:
+        cues.append(Cue(starts[first], ends[previous], timeline.span_text(first, previous + 1)))
+    return cues
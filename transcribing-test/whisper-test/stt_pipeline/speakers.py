@@ -0,0 +1,123 @@
+"""
+說話者感知的字幕段落
+generate_srt_with_speakers 把每個 AssemblyAI utterance 整段輸出，完全不理會 max_chars；
+ElevenLabs 版本則逐詞串接字串。這裡先依說話者切成連續區段，
+每個區段再以 segment_dp 依字數、顯示寬度、時長斷句，全程線性時間，輸出帶 speaker 的 Cue
+"""
+
+import math
+
+from .segment_dp import SegmentParams, segment_bounds, word_indices
+from .cues import Cue
+from .timeline import (
+    KIND_SPACING, KIND_WORD, WordTimeline, _confidence, _get, _is_cjk, _needs_space, from_provider,
+)
+from .width import width_prefix
+
+
+def speaker_runs(timeline, words=None):
+    """
+    依說話者把詞彙切成連續區段
+    回傳 (speaker_code, a, b) 清單，a..b-1 為 words 中的位置
+    """
+    words = word_indices(timeline) if words is None else words
+    speakers = timeline.speakers
+    runs = []
+    start = 0
+    for position in range(1, len(words) + 1):
+        if position == len(words) or speakers[words[position]] != speakers[words[start]]:
+            runs.append((speakers[words[start]], start, position))
+            start = position
+    return runs
+
+
+def build_speaker_cues(timeline, params=None):
+    """
+    說話者換人一定斷開，同一說話者的區段內以動態規劃斷句
+    寬度前綴和整份只算一次，各區段共用
+    """
+    params = params or SegmentParams()
+    words = word_indices(timeline)
+    widths = width_prefix(timeline) if params.max_width else None
+    starts, ends = timeline.starts, timeline.ends
+
+    cues = []
+    for code, a, b in speaker_runs(timeline, words):
+        run = words[a:b]
+        speaker = timeline.speaker(run[0])
+        for first, last in segment_bounds(timeline, params, run, widths):
+            i, j = run[first], run[last - 1]
+            cues.append(Cue(starts[i], ends[j], timeline.span_text(i, j + 1), speaker))
+    return cues
+
+
+def _split_text(text):
+    """沒有詞彙級資料的 utterance：中文逐字、其他語言依空白切詞"""
+    tokens = []
+    buffer = ""
+    for char in text:
+        if _is_cjk(char):
+            if buffer:
+                tokens.append(buffer)
+                buffer = ""
+            tokens.append(char)
+        elif char.isspace():
+            if buffer:
+                tokens.append(buffer)
+                buffer = ""
+        else:
+            buffer += char
+    if buffer:
+        tokens.append(buffer)
+    return tokens
+
+
+def timeline_from_utterances(utterances):
+    """
+    AssemblyAI utterances（dict 或 SDK 物件）→ WordTimeline
+    有 words 就直接使用（詞彙沒有 speaker 時沿用 utterance 的）；
+    只有文字時依字元比例內插每個詞的時間
+    """
+    timeline = WordTimeline()
+    previous_text = ""
+    for utterance in utterances:
+        speaker = _get(utterance, "speaker")
+        start = int(_get(utterance, "start", 0))
+        end = int(_get(utterance, "end", start))
+        words = _get(utterance, "words") or []
+        if words:
+            items = [
+                (_get(w, "text", ""), int(_get(w, "start", start)), int(_get(w, "end", end)),
+                 _get(w, "speaker") or speaker, _confidence(w))
+                for w in words
+            ]
+        else:
+            tokens = _split_text(_get(utterance, "text", ""))
+            total = sum(len(token) for token in tokens) or 1
+            items = []
+            offset = 0
+            for token in tokens:
+                token_start = start + (end - start) * offset // total
+                offset += len(token)
+                items.append((token, token_start, start + (end - start) * offset // total,
+                              speaker, math.nan))
+
+        for text, word_start, word_end, word_speaker, confidence in items:
+            if _needs_space(previous_text, text):
+                timeline.append(" ", word_start, word_start, KIND_SPACING)
+            timeline.append(text, word_start, word_end, KIND_WORD, word_speaker, confidence)
+            previous_text = text
+    return timeline.finalize()
+
+
+def speaker_cues(provider, result, params=None):
+    """
+    依供應商結果產生帶 speaker 的 Cue
+    詞彙本身有說話者標記時直接使用；否則改用 utterances（AssemblyAI）
+    """
+    timeline = from_provider(provider, result)
+    has_labels = any(code >= 0 for code in timeline.speakers)
+    utterances = _get(result, "utterances")
+    if not has_labels and utterances:
+        timeline = timeline_from_utterances(utterances)
+    return build_speaker_cues(timeline, params)
@@ -0,0 +1,81 @@
+"""
+串流增量斷句
+詞彙陸續抵達時就輸出已確定的字幕段落，不必等整份轉錄完成。
+待定的詞彙累積到一個視窗後，對視窗跑一次動態規劃，
+只輸出結尾前 lookahead 個詞之前的段落，其餘留待後續詞彙一起決定；
+每個詞最多參與常數次計算，整體為線性時間
+"""
+
+import math
+
+from .segment_dp import SegmentParams, cues_from_bounds, segment_bounds, word_indices
+from .timeline import KIND_WORD, WordTimeline, iter_items
+
+
+class StreamingSegmenter:
+    """
+    增量斷句器
+
+    feed() 每次加入一個項目，回傳這次確定下來的 Cue 清單（可能為空）；
+    串流結束時呼叫 flush() 取得剩下的段落。
+    一個詞最晚在其後再抵達 lookahead + 2 × lookback 個詞時確定
+    """
+
+    def __init__(self, params=None, lookahead=None):
+        self.params = params or SegmentParams()
+        self.lookahead = lookahead or self.params.max_lookback
+        self.window = self.lookahead + 2 * self.params.max_lookback
+        self._pending = []
+        self._pending_words = 0
+
+    def feed(self, text, start_ms, end_ms, kind=KIND_WORD, speaker=None, confidence=math.nan):
+        self._pending.append((text, start_ms, end_ms, kind, speaker, confidence))
+        if kind == KIND_WORD:
+            self._pending_words += 1
+            if self._pending_words >= self.window:
+                return self._commit(final=False)
+        return []
+
+    def flush(self):
+        """串流結束：輸出所有待定段落"""
+        return self._commit(final=True)
+
+    def _commit(self, final):
+        timeline = WordTimeline()
+        for item in self._pending:
+            timeline.append(*item)
+        timeline.finalize()
+        words = word_indices(timeline)
+        bounds = segment_bounds(timeline, self.params, words)
+
+        if not final:
+            # 結尾 lookahead 個詞還可能跟後續詞彙合併，這些詞所在的段落先不輸出
+            limit = len(words) - self.lookahead
+            bounds = [(a, b) for a, b in bounds if b <= limit]
+        if not bounds:
+            if final:
+                self._pending = []
+                self._pending_words = 0
+            return []
+
+        cues = cues_from_bounds(timeline, words, bounds)
+        consumed = bounds[-1][1]
+        if final or consumed >= len(words):
+            self._pending = []
+            self._pending_words = 0
+        else:
+            self._pending = self._pending[words[consumed]:]
+            self._pending_words -= consumed
+        return cues
+
+
+def segment_stream(words, provider="elevenlabs", params=None, lookahead=None, event_track=None):
+    """
+    產生器：逐一讀取供應商格式的詞彙（可以是仍在產生中的 iterator），
+    一有確定的段落就 yield Cue，結束時自動 flush
+    傳入 event_track（list）時，音效事件即時加入其中，不進入字幕
+    """
+    segmenter = StreamingSegmenter(params, lookahead)
+    for item in iter_items(provider, words, event_track):
+        yield from segmenter.feed(*item)
+    yield from segmenter.flush()
@@ -0,0 +1,337 @@
+"""
+SRT / WebVTT 解析與 SRT / WebVTT / ASS 輸出
+解析：以 mmap 讀檔，每次取約 1 MB 到段落邊界為一塊；格式整齊的區塊（編號 + 標準時間行 + 文字）
+以整塊的 split / translate / map 一次換算所有時間碼，其餘區塊逐段掃描，逐一產生 Cue。
+輸出：SubtitleWriter 以大緩衝區寫檔，Cue 可以邊產生邊寫入
+"""
+
+import mmap
+import re
+from itertools import repeat
+from operator import add, getitem
+from pathlib import Path
+
+from .cues import Cue
+from .timecode import cue_timings, format_ass_timestamps
+
+# 時間戳記：SRT 為 HH:MM:SS,mmm；WebVTT 的小時可省略、毫秒以 . 分隔
+TIMESTAMP_PATTERN = re.compile(rb"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})")
+
+# WebVTT 說話者標籤 <v 名稱>（可帶 class，如 <v.loud 名稱>）
+VOICE_PATTERN = re.compile(r"^<v(?:\.[^ >]*)?[ \t]+([^>]*)>")
+
+# SubtitleWriter 在 SRT 寫入的說話者前綴「[名稱] 」；與一般的「[笑聲] 」無法區分，只在 speakers=True 時解析
+SPEAKER_PATTERN = re.compile(r"^\[([^\[\]\n]+)\] ")
+
+# 每次整塊解析的大小（實際切在其後的第一個段落邊界）
+SCAN_CHUNK = 1024 * 1024
+
+# 標準時間行數字以外的字元；數字換成 0、. 換成 , 後應與 TIMING_TEMPLATE 相同
+TIMING_SEPARATORS = b":,.->"
+TIMING_SHAPE = bytes.maketrans(b"123456789.", b"000000000,")
+TIMING_TEMPLATE = b"00:00:00,000 --> 00:00:00,000\n"
+
+# HHMMSSmmm 形式的整數減去 HHMM_CORRECTION[HHMM] 即為毫秒
+HHMM_CORRECTION = [hhmm // 100 * 6_400_000 + hhmm % 100 * 40_000 for hhmm in range(10_000)]
+
+FORMATS = ("srt", "vtt", "ass")
+
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 批次輸出時每次格式化的段落數
+RENDER_BATCH = 4096
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+WrapStyle: 0
+ScaledBorderAndShadow: yes
+PlayResX: 1920
+PlayResY: 1080
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Noto Sans TC,64,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,3,0,2,60,60,50,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+def _digits_to_ms(value):
+    """HHMMSSmmm 形式的整數 → 毫秒"""
+    return (value // 10_000_000 * 3600 + value // 100_000 % 100 * 60
+            + value // 1000 % 100) * 1000 + value % 1000
+
+
+def parse_timestamp(raw):
+    """
+    bytes 時間戳記 → 整數毫秒，格式不符回傳 None
+    最常見的 HH:MM:SS,mmm 以一次 int() 換算，其他寫法（省略小時、毫秒不足三位）走正規表示式
+    """
+    if len(raw) == 12 and raw[2:3] == b":" and raw[5:6] == b":":
+        try:
+            return _digits_to_ms(int(raw.translate(None, b":,.")))
+        except ValueError:
+            pass
+    match = TIMESTAMP_PATTERN.fullmatch(raw)
+    if match is None:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    # 毫秒欄位不足三位時（如 ,5）視為小數：補零到三位
+    return (
+        (int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)) * 1000
+        + int(fraction.ljust(3, b"0"))
+    )
+
+
+def _split_speaker(text, brackets=False):
+    """
+    段落開頭的說話者標籤 → (文字, speaker)
+    WebVTT 的 <v 名稱> 一律轉回 speaker；SubtitleWriter 寫入 SRT 的「[名稱] 」只在 brackets=True 時解析
+    """
+    if text.startswith("<v"):
+        voice = VOICE_PATTERN.match(text)
+        if voice:
+            return text[voice.end():].replace("</v>", ""), voice.group(1).strip() or None
+    elif brackets and text.startswith("["):
+        label = SPEAKER_PATTERN.match(text)
+        if label:
+            return text[label.end():], label.group(1)
+    return text, None
+
+
+def _regular_cues(chunk, speakers=False):
+    """
+    每段都是「編號、標準時間行、文字」的區塊整塊解析，回傳 Cue 清單；不符合時回傳 None
+    時間行以 translate 驗證格式、刪掉分隔符號後一次 map(int)，不逐段比對字串。
+    每段單行文字時直接以行清單切片；有多行文字時先切段落，再以 map 依時間行位置切出時間行與文字
+    """
+    count = chunk.count(b"-->")
+    text = chunk.decode("utf-8", errors="replace")
+    if chunk.count(b"\n") == 4 * count - 2:
+        lines = text.split("\n")
+        if any(lines[3::4]):
+            return None
+        timings = "\n".join(lines[1::4]) + "\n"
+        texts = lines[2::4]
+    else:
+        blocks = text.split("\n\n")
+        if len(blocks) != count:
+            return None
+        # 編號行之後依序是 29 字元的時間行、換行、文字；不符的段落在下面的 translate 比對失敗
+        heads = list(map(add, map(str.find, blocks, repeat("\n")), repeat(1)))
+        bodies = list(map(add, heads, repeat(30)))
+        timings = "".join(map(getitem, blocks, map(slice, heads, bodies)))
+        texts = list(map(getitem, blocks, map(slice, bodies, repeat(None))))
+    timings = timings.encode("utf-8")
+    if timings.translate(TIMING_SHAPE) != TIMING_TEMPLATE * count:
+        return None
+    correction = HHMM_CORRECTION
+    ms = [value - correction[value // 100_000]
+          for value in map(int, timings.translate(None, TIMING_SEPARATORS).split())]
+    if chunk.find(b"\n<v") != -1 or (speakers and chunk.find(b"\n[") != -1):
+        texts, names = zip(*[_split_speaker(text, speakers) for text in texts])
+    else:
+        names = repeat(None)
+    return list(map(tuple.__new__, repeat(Cue), zip(ms[::2], ms[1::2], texts, names)))
+
+
+def scan_cues(data, speakers=False):
+    """
+    對 bytes / mmap 逐塊解析，逐一產生 Cue
+    格式整齊的區塊走 _regular_cues，其餘（省略編號、cue settings、空段落）逐段掃描；
+    WebVTT 的 <v 名稱> 轉成 speaker，speakers=True 時 SRT 的「[名稱] 」也轉成 speaker
+    """
+    if data.find(b"\r") != -1:
+        # CRLF 檔案先統一換行（只有這種情況需要複製一份）
+        data = bytes(data).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    size = len(data)
+    position = 0
+    if data[:16].lstrip(b"\xef\xbb\xbf").startswith(b"WEBVTT"):
+        # 檔頭區塊沒有段落，略過讓第一塊也能整塊解析
+        header_end = data.find(b"\n\n")
+        position = size if header_end < 0 else header_end + 2
+    while position < size:
+        end = data.find(b"\n\n", position + SCAN_CHUNK) if position + SCAN_CHUNK < size else -1
+        if end < 0:
+            end = size
+        chunk = data[position:end].strip(b"\n")
+        cues = _regular_cues(chunk, speakers)
+        if cues is None:
+            yield from _scan_chunk(chunk, speakers)
+        else:
+            yield from cues
+        position = end + 2
+
+
+def _scan_chunk(data, speakers=False):
+    """
+    逐段掃描：以 find("-->") 定位時間行、find 空行定位段落結尾，不切分行清單；
+    時間行後的 cue settings 會略過
+    """
+    find = data.find
+    size = len(data)
+    position = 0
+    while True:
+        arrow = find(b"-->", position)
+        if arrow < 0:
+            return
+        line_start = data.rfind(b"\n", 0, arrow) + 1
+        line_end = find(b"\n", arrow)
+        if line_end < 0:
+            line_end = size
+        line = data[line_start:line_end]
+        if len(line) == 29 and line[12:17] == b" --> ":
+            # 標準 SRT 時間行：刪掉分隔符號後兩個時間戳記合成一個整數
+            try:
+                value = int(line.translate(None, b":,. ->"))
+            except ValueError:
+                value = None
+        else:
+            value = None
+        if value is not None:
+            start, end = _digits_to_ms(value // 1_000_000_000), _digits_to_ms(value % 1_000_000_000)
+        else:
+            end_field = data[arrow + 3:line_end].strip()
+            if len(end_field) > 12:
+                end_field = end_field.split(None, 1)[0]
+            start = parse_timestamp(data[line_start:arrow].strip().lstrip(b"\xef\xbb\xbf"))
+            end = parse_timestamp(end_field)
+            if start is None or end is None:
+                position = arrow + 3
+                continue
+
+        text_end = find(b"\n\n", line_end)
+        if text_end < 0:
+            text_end = size
+        text = data[line_end + 1:text_end].rstrip(b"\n").decode("utf-8", errors="replace")
+        yield Cue(start, end, *_split_speaker(text, speakers))
+        position = text_end
+
+
+def iter_cues(source, speakers=False):
+    """
+    解析 SRT 或 WebVTT，逐一產生 Cue
+    source 為檔案路徑、bytes 或 str；檔案以 mmap 讀取，一次只複製一塊。
+    speakers=True 時把 SRT 段落開頭的「[名稱] 」（SubtitleWriter 的寫法）轉回 speaker；
+    預設不解析，其他來源的「[笑聲] 好的」之類文字保持原樣
+    """
+    if isinstance(source, str) and ("-->" in source or "\n" in source):
+        yield from scan_cues(source.encode("utf-8"), speakers)
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield from scan_cues(source, speakers)
+        return
+
+    path = Path(source)
+    if path.stat().st_size == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield from scan_cues(data, speakers)
+
+
+def read_cues(source, speakers=False):
+    return list(iter_cues(source, speakers))
+
+
+def _ass_text(text):
+    return text.replace("\n", "\\N")
+
+
+class SubtitleWriter:
+    """
+    緩衝寫入器
+
+    with SubtitleWriter("out.srt") as writer:
+        for cue in cues:
+            writer.write(cue)
+
+    格式由 format 或副檔名決定（srt / vtt / ass）；
+    有 speaker 的 Cue 在 SRT 寫成「[speaker] 文字」、WebVTT 用 <v speaker>、ASS 放在 Name 欄位；
+    WebVTT 由 iter_cues 讀回時還原為 speaker，SRT 需 iter_cues(..., speakers=True)
+    """
+
+    def __init__(self, path, format=None, buffer_size=WRITE_BUFFER_SIZE):
+        self.path = Path(path)
+        self.format = (format or self.path.suffix.lstrip(".") or "srt").lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"不支援的字幕格式: {self.format}")
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        self._file = open(self.path, "w", encoding="utf-8", newline="\n", buffering=self.buffer_size)
+        if self.format == "vtt":
+            self._file.write("WEBVTT\n\n")
+        elif self.format == "ass":
+            self._file.write(ASS_HEADER)
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, cue):
+        self.write_all((cue,))
+
+    def write_all(self, cues):
+        """分批格式化時間碼後寫入，回傳累計段落數"""
+        batch = []
+        for cue in cues:
+            batch.append(cue)
+            if len(batch) >= RENDER_BATCH:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+        return self.count
+
+    def _write_batch(self, cues):
+        self._file.write(render_cues(cues, self.count + 1, self.format))
+        self.count += len(cues)
+
+
+def render_cues(cues, first_index=1, format="srt"):
+    """
+    一批 Cue 的字幕文字（含結尾空行）
+    所有時間碼以 timecode 批次格式化，不逐段呼叫格式化函式
+    """
+    if format == "ass":
+        stamps = format_ass_timestamps(value for cue in cues for value in (cue.start, cue.end))
+        return "".join(
+            f"Dialogue: 0,{stamps[2 * i]},{stamps[2 * i + 1]},"
+            f"Default,{cue.speaker or ''},0,0,0,,{_ass_text(cue.text)}\n"
+            for i, cue in enumerate(cues)
+        )
+    if format == "vtt":
+        timings = cue_timings(cues, ".")
+        return "".join(
+            f"{index}\n{timing}\n{f'<v {cue.speaker}>' if cue.speaker else ''}{cue.text}\n\n"
+            for index, timing, cue in zip(range(first_index, first_index + len(cues)), timings, cues)
+        )
+    timings = cue_timings(cues)
+    return "".join(
+        f"{index}\n{timing}\n{f'[{cue.speaker}] ' if cue.speaker else ''}{cue.text}\n\n"
+        for index, timing, cue in zip(range(first_index, first_index + len(cues)), timings, cues)
+    )
+
+
+def dumps(cues, format="srt"):
+    """把 Cue 清單轉成字幕字串"""
+    header = {"vtt": "WEBVTT\n\n", "ass": ASS_HEADER}.get(format, "")
+    return header + render_cues(list(cues), 1, format)
+
+
+def write_cues(path, cues, format=None):
+    """寫入字幕檔，回傳段落數"""
+    with SubtitleWriter(path, format) as writer:
+        return writer.write_all(cues)
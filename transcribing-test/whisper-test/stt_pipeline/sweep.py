@@ -0,0 +1,144 @@
+"""
+供應商參數組合並行掃描
+音檔只讀一次放在共用記憶體緩衝區，各組參數以有限並行數同時送出，
+回傳每組參數的延遲與結果摘要表
+"""
+
+import asyncio
+import time
+from pathlib import Path
+
+from .engine import TranscriptionEngine
+
+MODEL_KEYS = ("model", "model_id")
+LABEL_KEYS = ("description", "label")
+
+
+def read_audio_once(audio):
+    """把音檔讀成 (檔名, bytes)，之後每組參數共用同一份內容"""
+    if isinstance(audio, tuple):
+        return audio
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return ("audio.mp3", bytes(audio))
+    path = Path(audio)
+    return (path.name, path.read_bytes())
+
+
+def split_config(config, default_model=None):
+    """
+    拆出 (label, model, options)
+    config 可以沿用測試腳本的寫法，例如 {"model_id": "scribe_v1", "diarize": True}
+    或 {"model": "gpt-4o-transcribe", "response_format": "json", "description": "..."}
+    """
+    options = dict(config)
+    model = default_model
+    for key in MODEL_KEYS:
+        if key in options:
+            model = options.pop(key)
+    label = None
+    for key in LABEL_KEYS:
+        if key in options:
+            label = options.pop(key)
+    return label, model, options
+
+
+def summarize_result(result):
+    """結果摘要：文字長度、詞彙數、段落數、說話者數"""
+    words = result.get("words") or []
+    speakers = {
+        w.get("speaker_id") or w.get("speaker")
+        for w in words
+        if isinstance(w, dict) and (w.get("speaker_id") or w.get("speaker"))
+    }
+    return {
+        "text_length": len(result.get("text", "")),
+        "word_count": len(words),
+        "segment_count": len(result.get("segments") or []),
+        "speaker_count": len(speakers),
+    }
+
+
+async def run_sweep(engine, audio, provider, configs, model=None, concurrency=4,
+                    use_cache=True, keep_results=False):
+    """
+    以同一音檔跑多組參數
+    回傳每組一列的 dict 清單（順序與 configs 相同）：
+    index, label, model, options, success, latency, error 及 summarize_result() 的欄位
+    """
+    buffer = await asyncio.to_thread(read_audio_once, audio)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index, config):
+        label, config_model, options = split_config(config, model)
+        row = {
+            "index": index,
+            "label": label or f"config_{index}",
+            "model": config_model,
+            "options": options,
+        }
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                result = await engine.transcribe(buffer, provider, config_model, options,
+                                                 use_cache=use_cache)
+            except Exception as e:
+                row.update(success=False, latency=time.perf_counter() - start_time, error=str(e))
+                return row
+
+        row.update(success=True, latency=time.perf_counter() - start_time, error=None)
+        row.update(summarize_result(result))
+        if keep_results:
+            row["result"] = result
+        return row
+
+    return await asyncio.gather(*(run(i, config) for i, config in enumerate(configs, 1)))
+
+
+def format_table(rows):
+    """把掃描結果排成純文字表格"""
+    headers = ["#", "label", "model", "ok", "latency", "text", "words", "segs", "spk"]
+    lines = []
+    for row in rows:
+        lines.append([
+            str(row["index"]),
+            str(row["label"]),
+            str(row["model"]),
+            "✅" if row["success"] else "❌",
+            f"{row['latency']:.2f}s",
+            str(row.get("text_length", "-")),
+            str(row.get("word_count", "-")),
+            str(row.get("segment_count", "-")),
+            str(row.get("speaker_count", "-")),
+        ])
+
+    widths = [max(len(h), *(len(line[i]) for line in lines)) if lines else len(h)
+              for i, h in enumerate(headers)]
+    output = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    output.append("  ".join("-" * w for w in widths))
+    for line in lines:
+        output.append("  ".join(cell.ljust(w) for cell, w in zip(line, widths)))
+    for row in rows:
+        if not row["success"]:
+            output.append(f"❌ {row['label']}: {row['error']}")
+    return "\n".join(output)
+
+
+def main():
+    """範例：test_elevenlabs_speaker_diarization.py 的五組參數改為並行掃描"""
+    configs = [
+        {"model_id": "scribe_v1"},
+        {"model_id": "scribe_v1_experimental"},
+        {"model_id": "scribe_v1", "diarize": True},
+        {"model_id": "scribe_v1", "diarize": True, "num_speakers": 2},
+        {"model_id": "scribe_v1", "tag_audio_events": False},
+    ]
+
+    async def run():
+        async with TranscriptionEngine() as engine:
+            return await run_sweep(engine, "../multispeaker-test.MP3", "elevenlabs", configs)
+
+    print(format_table(asyncio.run(run())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+專有名詞命中檢查
+fair_quality_assessment、precise_quality_comparison、analyze_assemblyai_result 以一串
+if '台積電' in text or '台积电' in text 判斷術語是否轉錄正確，每個詞各掃一次全文。
+這裡把詞彙表（含異體寫法）編譯成一個 Aho-Corasick 自動機，一次走訪就找出所有命中，
+回傳命中、未命中與位置；輸入為 WordTimeline 時同時附上起訖時間。
+比對前以 textnorm 正規化（繁簡、全形半形、大小寫，忽略空白），
+台積電 / 台积电、NVIDIA / nvidia 不必分別列出
+"""
+
+from bisect import bisect_right
+from collections import Counter, deque, namedtuple
+from dataclasses import dataclass, field
+
+from .textnorm import normalize_text, normalize_with_offsets
+from .timeline import WordTimeline, _get, from_provider
+
+# test_assemblyai_fixed.py 的 word_boost
+WORD_BOOST = ["台積電", "聯電", "日月光", "NVIDIA", "ADR", "納斯達克", "費半", "比特幣", "聯準會"]
+
+# 正規化無法涵蓋的異體寫法（簡體由繁簡對照自動涵蓋）
+DEFAULT_VARIANTS = {
+    "台積電": ["TSMC"],
+    "聯電": ["UMC"],
+    "日月光": ["ASE"],
+    "NVIDIA": ["輝達", "英偉達"],
+    "ADR": ["美國存託憑證"],
+    "納斯達克": ["那斯達克", "Nasdaq"],
+    "費半": ["費城半導體"],
+    "比特幣": ["Bitcoin", "BTC"],
+    "聯準會": ["美聯儲", "聯儲局"],
+}
+
+TermHit = namedtuple("TermHit", ["term", "text", "start", "end", "start_ms", "end_ms"],
+                     defaults=[None, None])
+
+
+def _is_word_char(char):
+    return char.isascii() and char.isalnum()
+
+
+@dataclass
+class TermReport:
+    """一份轉錄的檢查結果；hits 依出現位置排序，start / end 為原文字元位置"""
+    terms: list
+    hits: list = field(default_factory=list)
+    counts: Counter = field(default_factory=Counter)
+
+    @property
+    def found(self):
+        return [term for term in self.terms if self.counts[term]]
+
+    @property
+    def misses(self):
+        return [term for term in self.terms if not self.counts[term]]
+
+    @property
+    def hit_rate(self):
+        return len(self.found) / len(self.terms) if self.terms else 0.0
+
+    def positions(self, term):
+        return [hit for hit in self.hits if hit.term == term]
+
+    def to_dict(self):
+        return {
+            "hit_rate": round(self.hit_rate, 4),
+            "found": self.found,
+            "misses": self.misses,
+            "counts": {term: self.counts[term] for term in self.found},
+            "hits": [hit._asdict() for hit in self.hits],
+        }
+
+
+class Glossary:
+    """
+    編譯好的詞彙表
+    terms 為詞彙清單（異體寫法取自 variants）或 {標準寫法: [異體寫法, ...]}；
+    以英數字開頭 / 結尾的寫法要求前後不是英數字，ADR 不會命中 ADRs
+    """
+
+    def __init__(self, terms=WORD_BOOST, variants=DEFAULT_VARIANTS):
+        if isinstance(terms, dict):
+            entries = list(terms.items())
+        else:
+            entries = [(term, (variants or {}).get(term, ())) for term in terms]
+
+        self.terms = []
+        self._term_of = []        # 寫法 → 標準詞索引
+        self._lengths = []        # 寫法正規化後的長度
+        self._bounded = []        # (開頭需斷詞, 結尾需斷詞)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for term, spellings in entries:
+            term_index = len(self.terms)
+            self.terms.append(term)
+            for spelling in (term, *spellings):
+                self._insert(spelling, term_index)
+        self._link()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _insert(self, spelling, term_index):
+        key = normalize_text(spelling, ignore_whitespace=True)
+        if not key:
+            return
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        if self._output[state]:
+            return   # 同一寫法已由先前的詞登錄
+        self._output[state] = (len(self._lengths),)
+        self._term_of.append(term_index)
+        self._lengths.append(len(key))
+        self._bounded.append((_is_word_char(key[0]), _is_word_char(key[-1])))
+
+    def _link(self):
+        """BFS 建立失敗連結，並把失敗狀態的輸出併入（命中短寫法不需沿連結回溯）"""
+        goto, fail, output = self._goto, self._fail, self._output
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                target = goto[link].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                if output[fail[next_state]]:
+                    output[next_state] = output[next_state] + output[fail[next_state]]
+
+    def scan(self, text, overlapping=False):
+        """
+        回傳 [(詞索引, start, end), ...]，start / end 為原文字元位置
+        預設重疊的命中取最左、最長（費城半導體 不會再算一次 半導體）
+        """
+        normalized, offsets = normalize_with_offsets(text, ignore_whitespace=True)
+        goto, fail, output = self._goto, self._fail, self._output
+        lengths, bounded, term_of = self._lengths, self._bounded, self._term_of
+        matches = []
+        state = 0
+        for position, char in enumerate(normalized):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for spelling in output[state]:
+                first = position - lengths[spelling] + 1
+                start, end = offsets[first], offsets[position] + 1
+                check_start, check_end = bounded[spelling]
+                if check_start and start and _is_word_char(text[start - 1]):
+                    continue
+                if check_end and end < len(text) and _is_word_char(text[end]):
+                    continue
+                matches.append((term_of[spelling], start, end))
+
+        if overlapping or len(matches) < 2:
+            return sorted(matches, key=lambda match: (match[1], match[2]))
+        matches.sort(key=lambda match: (match[1], -match[2]))
+        result = []
+        last_end = 0
+        for match in matches:
+            if match[1] >= last_end:
+                result.append(match)
+                last_end = match[2]
+        return result
+
+    def check(self, source, overlapping=False):
+        """檢查一份轉錄；source 為文字或 WordTimeline"""
+        timeline = source if isinstance(source, WordTimeline) else None
+        text = timeline.buffer if timeline is not None else source
+        report = TermReport(terms=list(self.terms))
+        for term_index, start, end in self.scan(text, overlapping):
+            term = self.terms[term_index]
+            if timeline is not None:
+                first = bisect_right(timeline.offsets, start) - 1
+                last = bisect_right(timeline.offsets, end - 1) - 1
+                hit = TermHit(term, text[start:end], start, end,
+                              timeline.starts[first], timeline.ends[last])
+            else:
+                hit = TermHit(term, text[start:end], start, end)
+            report.hits.append(hit)
+            report.counts[term] += 1
+        return report
+
+    def check_all(self, sources, overlapping=False):
+        """{名稱: 文字或 WordTimeline} → {名稱: TermReport}，各供應商結果一起比較"""
+        return {name: self.check(source, overlapping) for name, source in sources.items()}
+
+
+_default_glossary = None
+
+
+def check_terms(provider, result, glossary=None):
+    """
+    對供應商結果檢查詞彙表（預設為 word_boost）；有詞彙時間軸就附上時間，否則只比對 text
+    """
+    global _default_glossary
+    if glossary is None:
+        if _default_glossary is None:
+            _default_glossary = Glossary()
+        glossary = _default_glossary
+    timeline = from_provider(provider, result)
+    if len(timeline):
+        return glossary.check(timeline)
+    return glossary.check(_get(result, "text") or "")
@@ -0,0 +1,171 @@
+"""
+文字正規化：繁簡、全形半形、標點、大小寫
+各供應商輸出的字形不一：ElevenLabs 多為簡體、AssemblyAI 與 Whisper 多為繁體，
+標點有全形、半形與完全沒有標點三種。比較轉錄結果前先統一成同一種寫法：
+NFKC 把全形英數與標點轉成半形，內建的繁→簡對照表（不依賴 opencc）把繁體
+統一成簡體（多對一的方向，如 髮 / 發 → 发），最後一次 str.translate 完成
+字形、標點對應與刪除
+"""
+
+import unicodedata
+from array import array
+
+# 繁 → 簡對照（常用字；每組兩字，前者繁體、後者簡體）
+_SCRIPT_PAIRS = """
+萬万 與与 專专 業业 東东 絲丝 兩两 嚴严 喪丧 個个 豐丰 臨临 為为 麗丽 舉举 麼么 義义 烏乌 樂乐 喬乔
+習习 鄉乡 書书 買买 亂乱 爭争 於于 虧亏 雲云 亞亚 產产 畝亩 親亲 億亿 僅仅 從从 侖仑 倉仓 儀仪 們们
+價价 眾众 衆众 優优 會会 傘伞 偉伟 傳传 傷伤 倫伦 偽伪 體体 餘余 傭佣 俠侠 侶侣 僥侥 偵侦 側侧 僑侨
+儈侩 儕侪 儂侬 儔俦 儼俨 倆俩 儷俪 儉俭 債债 傾倾 僂偻 僨偾 償偿 儻傥 儐傧 儲储 兒儿 兌兑 黨党 蘭兰
+關关 興兴 養养 獸兽 內内 岡冈 冊册 寫写 軍军 農农 馮冯 衝冲 沖冲 決决 況况 凍冻 淨净 涼凉 減减 湊凑
+凜凛 幾几 鳳凤 憑凭 凱凯 擊击 鑿凿 芻刍 劃划 劉刘 則则 剛刚 創创 刪删 別别 劑剂 剮剐 劍剑 剝剥 劇剧
+勸劝 辦办 務务 動动 勵励 勁劲 勞劳 勢势 勳勋 勻匀 匯汇 彙汇 匱匮 區区 醫医 華华 協协 單单 賣卖 盧卢
+鹵卤 衛卫 卻却 廠厂 廳厅 歷历 曆历 厲厉 壓压 厭厌 廁厕 廂厢 廈厦 廚厨 廄厩 縣县 參参 雙双 發发 髮发
+變变 敘叙 疊叠 葉叶 號号 嘆叹 嘰叽 籲吁 後后 嚇吓 呂吕 嗎吗 噸吨 聽听 啟启 吳吴 嘔呕 唄呗 員员 嗆呛
+嗚呜 詠咏 嚨咙 嚀咛 響响 啞哑 噠哒 嘩哗 喲哟 嘮唠 喚唤 嘖啧 嗇啬 嘯啸 噴喷 嘍喽 噯嗳 噓嘘 嚶嘤 囑嘱
+嚕噜 團团 糰团 園园 圍围 國国 圖图 圓圆 聖圣 場场 壞坏 塊块 堅坚 壇坛 壩坝 塢坞 墳坟 墜坠 壟垄 壘垒
+墾垦 墊垫 塹堑 墮堕 牆墙 壯壮 聲声 殼壳 壺壶 處处 備备 復复 複复 夠够 頭头 誇夸 夾夹 奪夺 奮奋 獎奖
+奧奥 妝妆 婦妇 媽妈 嫵妩 薑姜 婁娄 嬌娇 娛娱 嫻娴 嬰婴 嬸婶 孫孙 學学 寧宁 寶宝 實实 寵宠 審审 憲宪
+宮宫 寬宽 賓宾 寢寝 對对 尋寻 導导 壽寿 將将 爾尔 塵尘 嘗尝 堯尧 尷尴 屍尸 盡尽 層层 屆届 屬属 屢屡
+嶼屿 歲岁 豈岂 崗岗 嵐岚 島岛 嶺岭 峽峡 崢峥 巒峦 嶄崭 巔巅 鞏巩 幣币 帥帅 師师 帳帐 簾帘 幟帜 帶带
+幀帧 幫帮 莊庄 慶庆 廬庐 庫库 應应 廟庙 龐庞 廢废 開开 異异 棄弃 張张 彌弥 彎弯 彈弹 強强 歸归 當当
+錄录 徹彻 徑径 憶忆 懺忏 憂忧 懷怀 態态 慫怂 悵怅 愴怆 憐怜 總总 戀恋 懇恳 惡恶 惱恼 悅悦 懸悬 憫悯
+驚惊 懼惧 慘惨 懲惩 憊惫 慚惭 慣惯 憤愤 願愿 懶懒 戲戏 戰战 戶户 紮扎 撲扑 執执 擴扩 掃扫 揚扬 擾扰
+撫抚 搶抢 護护 報报 擔担 擬拟 攏拢 揀拣 擁拥 攔拦 擰拧 撥拨 擇择 掛挂 摯挚 撓挠 擋挡 掙挣 擠挤 揮挥
+撈捞 損损 撿捡 換换 搗捣 據据 擄掳 擲掷 摻掺 攬揽 攙搀 擱搁 摟搂 攪搅 攜携 攝摄 擺摆 搖摇 攤摊 撐撑
+攆撵 擷撷 攢攒 敵敌 斂敛 數数 齋斋 鬥斗 斬斩 斷断 無无 舊旧 時时 曠旷 曇昙 晝昼 顯显 晉晋 曬晒 曉晓
+暈晕 暉晖 暫暂 曖暧 術术 樸朴 機机 殺杀 雜杂 權权 條条 來来 楊杨 傑杰 極极 構构 樞枢 棗枣 槍枪 楓枫
+櫃柜 檸柠 柵栅 標标 棧栈 棟栋 欄栏 樹树 棲栖 樣样 檔档 橋桥 樺桦 樁桩 夢梦 檢检 橢椭 樓楼 欖榄 櫻樱
+櫥橱 橫横 歡欢 歐欧 殲歼 殘残 殯殡 毆殴 毀毁 畢毕 斃毙 氈毡 氣气 氫氢 漢汉 湯汤 洶汹 溝沟 沒没 瀝沥
+淪沦 滄沧 滬沪 濘泞 淚泪 瀉泻 潑泼 澤泽 潔洁 灑洒 窪洼 淺浅 漿浆 澆浇 濁浊 測测 濟济 瀏浏 渾浑 濃浓
+濤涛 澇涝 漣涟 渦涡 渙涣 滌涤 潤润 澗涧 漲涨 澀涩 澱淀 淵渊 漬渍 漸渐 漁渔 瀋沈 滲渗 溫温 灣湾 濕湿
+潰溃 濺溅 滾滚 滯滞 滿满 濾滤 濫滥 濱滨 灘滩 瀟潇 潛潜 瀾澜 瀕濒 滅灭 燈灯 靈灵 災灾 燦灿 爐炉 燉炖
+點点 煉炼 鍊炼 熾炽 爍烁 爛烂 燭烛 煙烟 煩烦 燒烧 燴烩 燙烫 熱热 煥焕 愛爱 爺爷 犧牺 狀状 猶犹 狽狈
+獰狞 獨独 狹狭 獅狮 獄狱 獵猎 豬猪 貓猫 獻献 瑪玛 環环 現现 璽玺 瓏珑 瑣琐 瓊琼 甕瓮 電电 畫画 暢畅
+療疗 瘡疮 瘋疯 癢痒 瘓痪 癡痴 癱瘫 癮瘾 癲癫 皺皱 盞盏 鹽盐 監监 蓋盖 盜盗 盤盘 睜睁 瞞瞒 礦矿 碼码
+磚砖 礎础 碩硕 確确 礙碍 禮礼 禱祷 禍祸 祿禄 禪禅 離离 禿秃 種种 積积 稱称 穢秽 穩稳 窮穷 竊窃 竅窍
+窯窑 竄窜 窩窝 窺窥 豎竖 競竞 筆笔 筍笋 籠笼 籌筹 簽签 簡简 節节 範范 築筑 篤笃 篩筛 籃篮 籬篱 糧粮
+粵粤 糞粪 繫系 係系 緊紧 糾纠 紀纪 約约 紅红 紋纹 納纳 紐纽 純纯 紗纱 紙纸 級级 紛纷 紡纺 紹绍 經经
+紳绅 終终 組组 絆绊 綁绑 絨绒 結结 繞绕 給给 絢绚 絡络 絕绝 絞绞 統统 絹绢 綉绣 綜综 綠绿 綢绸 維维
+綱纲 網网 綴缀 綺绮 綻绽 綽绰 緒绪 線线 緝缉 緞缎 締缔 緣缘 編编 緩缓 緬缅 緯纬 練练 緻致 縫缝 縮缩
+縱纵 縷缕 績绩 繃绷 織织 繕缮 繡绣 繩绳 繪绘 繭茧 繳缴 繼继 纏缠 續续 纖纤 纜缆 罰罚 罵骂 罷罢 羅罗
+羈羁 翹翘 聞闻 聯联 聰聪 聳耸 職职 肅肃 腸肠 膚肤 腎肾 腫肿 脹胀 脅胁 膽胆 勝胜 朧胧 脛胫 膠胶 脈脉
+臍脐 腦脑 膿脓 腳脚 脫脱 臉脸 臘腊 膩腻 騰腾 臥卧 臺台 檯台 颱台 艦舰 艙舱 艱艰 艷艳 藝艺 蘆芦 蘇苏
+蘋苹 莖茎 薦荐 莢荚 藥药 萊莱 蓮莲 獲获 穫获 瑩莹 鶯莺 蘿萝 螢萤 營营 縈萦 蕭萧 薩萨 蔥葱 蔣蒋 藍蓝
+薔蔷 蘊蕴 虜虏 慮虑 蟲虫 蝦虾 雖虽 螞蚂 蠶蚕 蟻蚁 蠻蛮 蛻蜕 蝸蜗 蠟蜡 蠅蝇 蟬蝉 銜衔 補补 襯衬 裝装
+裡里 裏里 製制 褲裤 襖袄 見见 觀观 規规 覓觅 視视 覽览 覺觉 覦觎 觸触 計计 訂订 認认 譏讥 討讨 讓让
+訓训 議议 訊讯 記记 講讲 諱讳 訝讶 許许 訛讹 論论 訟讼 諷讽 設设 訪访 訣诀 證证 評评 詛诅 識识 詐诈
+訴诉 診诊 詞词 譯译 試试 詩诗 誠诚 話话 誕诞 詮诠 詭诡 詢询 該该 詳详 詫诧 誡诫 誣诬 語语 誤误 誘诱
+誨诲 說说 誦诵 請请 諸诸 諾诺 讀读 誹诽 課课 誰谁 調调 諒谅 談谈 誼谊 謀谋 諜谍 謊谎 諧谐 謂谓 諭谕
+諮谘 諺谚 謎谜 謝谢 謠谣 謗谤 謙谦 謹谨 謬谬 譚谭 譜谱 譴谴 貝贝 貞贞 負负 財财 貢贡 貧贫 貨货 販贩
+貪贪 貫贯 責责 貯贮 貳贰 貴贵 貶贬 貸贷 費费 貼贴 貿贸 賀贺 賄贿 資资 賈贾 賊贼 賜赐 賞赏 賠赔 賢贤
+賤贱 賦赋 質质 賬账 賭赌 賴赖 賺赚 購购 賽赛 贅赘 贈赠 贊赞 贏赢 贓赃 贖赎 趕赶 趙赵 趨趋 躍跃 踐践
+蹺跷 踴踊 蹤踪 軀躯 車车 軌轨 軒轩 軟软 軸轴 輕轻 載载 較较 輔辅 輛辆 輩辈 輝辉 輪轮 輯辑 輸输 輻辐
+輾辗 輿舆 轄辖 轉转 轍辙 轎轿 轟轰 辭辞 辮辫 辯辩 邊边 遼辽 達达 遷迁 過过 邁迈 運运 還还 這这 進进
+遠远 違违 連连 遲迟 跡迹 蹟迹 選选 遜逊 遞递 邏逻 遺遗 遙遥 鄧邓 郵邮 鄒邹 鄰邻 鬱郁 鄭郑 醞酝 醜丑
+醬酱 釀酿 釋释 鑒鉴 鑑鉴 針针 釘钉 釣钓 鈣钙 鈔钞 鈍钝 鈕钮 鈴铃 鉀钾 鉛铅 鉤钩 鉗钳 銀银 銅铜 銘铭
+銳锐 鋁铝 鋅锌 鋒锋 鋪铺 鋼钢 錐锥 錘锤 錠锭 錢钱 錦锦 錫锡 錯错 鍋锅 鍍镀 鍛锻 鍵键 鍾钟 鐘钟 鎂镁
+鎊镑 鎖锁 鎮镇 鏈链 鏟铲 鏡镜 鏽锈 鐵铁 鑄铸 鑰钥 鑲镶 鑼锣 鑽钻 長长 門门 閃闪 閉闭 閏闰 閑闲 閒闲
+間间 閘闸 閣阁 閥阀 閨闺 閱阅 闊阔 闖闯 闡阐 闢辟 隊队 陽阳 陰阴 陣阵 階阶 際际 陸陆 隴陇 陳陈 險险
+隨随 隱隐 隸隶 難难 雛雏 雞鸡 霧雾 靂雳 靄霭 靜静 韁缰 韋韦 韌韧 韓韩 韻韵 頁页 頂顶 頃顷 項项 順顺
+須须 鬚须 頑顽 顧顾 頓顿 頒颁 頌颂 預预 領领 頗颇 頸颈 頻频 頹颓 穎颖 顆颗 題题 顏颜 額额 顎颚 類类
+顛颠 顫颤 顱颅 風风 颳刮 颶飓 飄飘 飆飙 飛飞 飢饥 饑饥 飩饨 飪饪 飯饭 飲饮 飼饲 飽饱 飾饰 餃饺 餅饼
+餌饵 餓饿 餚肴 餛馄 餡馅 館馆 餵喂 饅馒 饋馈 饒饶 饞馋 馬马 馭驭 馳驰 馴驯 駁驳 駐驻 駒驹 駕驾 駛驶
+駝驼 駭骇 駱骆 駿骏 騎骑 騙骗 騷骚 驅驱 驕骄 驗验 驛驿 驟骤 驢驴 骯肮 髏髅 髒脏 鬆松 鬍胡 鬢鬓 鬧闹
+魯鲁 鮑鲍 鮮鲜 鯉鲤 鯊鲨 鯨鲸 鱷鳄 鳥鸟 鳴鸣 鴉鸦 鴕鸵 鴨鸭 鴻鸿 鵝鹅 鵡鹉 鵬鹏 鶴鹤 鷹鹰 鸚鹦 鹹咸
+鹼碱 麥麦 麵面 黃黄 黴霉 齊齐 齒齿 齡龄 龍龙 龔龚 龜龟 乾干 幹干 準准 佔占 佈布 採采 夥伙 捨舍 遊游
+著着 託托 傢家 嚮向 摺折 週周 併并 並并 衹只 祇只 隻只 瞭了 頤颐 綫线 蒐搜 彆别 麽么 甦苏 礬矾 凈净
+喫吃 捲卷 牠它 姊姐 裊袅 祕秘 汙污 絃弦 遶绕 簷檐 蔘参 擡抬 牀床 菸烟 鑪炉 衊蔑 穀谷 醃腌 閤合 稅税
+細细 鏢镖 矇蒙 濛蒙 懞蒙
+"""
+
+# NFKC 之後仍是全形的中文標點，對應到半形
+PUNCTUATION_MAP = {
+    "。": ".", "、": ",", "｡": ".", "､": ",",
+    "「": '"', "」": '"', "『": '"', "』": '"', "“": '"', "”": '"',
+    "‘": "'", "’": "'", "《": '"', "》": '"', "〈": '"', "〉": '"',
+    "【": "[", "】": "]", "〔": "[", "〕": "]",
+    "—": "-", "–": "-", "～": "~", "・": "-", "·": "-",
+}
+
+SCRIPT_TABLE = {ord(pair[0]): pair[1] for pair in _SCRIPT_PAIRS.split()}
+
+
+class _TranslateTable(dict):
+    """str.translate 用的對照表；第一次遇到的字元才判斷類別，結果快取"""
+
+    def __init__(self, fold_script, ignore_punctuation, ignore_whitespace):
+        super().__init__()
+        self.fold_script = fold_script
+        self.ignore_punctuation = ignore_punctuation
+        self.ignore_whitespace = ignore_whitespace
+        self.pieces = {}    # normalize_with_offsets 的逐字結果
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        category = unicodedata.category(char)
+        if self.ignore_whitespace and (category[0] == "Z" or char.isspace()):
+            value = None
+        elif self.ignore_punctuation and category[0] == "P":
+            value = None
+        elif char in PUNCTUATION_MAP:
+            value = PUNCTUATION_MAP[char]
+        elif self.fold_script and codepoint in SCRIPT_TABLE:
+            value = SCRIPT_TABLE[codepoint]
+        elif category[0] == "Z" or char.isspace():
+            value = " "
+        else:
+            value = char
+        self[codepoint] = value
+        return value
+
+
+_tables = {}
+
+
+def _table(fold_script, ignore_punctuation, ignore_whitespace):
+    key = (fold_script, ignore_punctuation, ignore_whitespace)
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = _TranslateTable(*key)
+    return table
+
+
+def to_simplified(text):
+    """繁體 → 簡體（只做字形對應）"""
+    return text.translate(SCRIPT_TABLE)
+
+
+def normalize_text(text, fold_script=True, ignore_punctuation=False, ignore_whitespace=False):
+    """
+    比較用的正規化：NFKC、中文標點轉半形、小寫、繁 → 簡
+    ignore_punctuation 刪除所有標點；ignore_whitespace 刪除所有空白，
+    否則各種空白（含全形空白、換行）統一成一個半形空白
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = text.translate(_table(fold_script, ignore_punctuation, ignore_whitespace))
+    if not ignore_whitespace:
+        text = " ".join(text.split())
+    return text
+
+
+def normalize_with_offsets(text, fold_script=True, ignore_punctuation=False, ignore_whitespace=False):
+    """
+    逐字正規化並記錄每個輸出字元在原文的位置，供比對結果換回原文位置與時間
+    與 normalize_text 的差別：逐字做 NFKC，空白不合併（每個空白字元各自轉成半形空白）
+    回傳 (正規化文字, array('l') 原文索引)
+    """
+    table = _table(fold_script, ignore_punctuation, ignore_whitespace)
+    cache = table.pieces
+    pieces = []
+    offsets = array("l")
+    for index, char in enumerate(text):
+        piece = cache.get(char)
+        if piece is None:
+            piece = cache[char] = unicodedata.normalize("NFKC", char).lower().translate(table)
+        if piece:
+            pieces.append(piece)
+            if len(piece) == 1:
+                offsets.append(index)
+            else:
+                offsets.extend([index] * len(piece))
+    return "".join(pieces), offsets
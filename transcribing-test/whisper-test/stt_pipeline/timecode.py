@@ -0,0 +1,121 @@
+"""
+字幕時間碼批次格式化
+各腳本的 format_srt_time 以 int((seconds % 1) * 1000) 取毫秒，浮點誤差會讓 1.001 變成 1.000；
+有的版本收秒、有的收毫秒。這裡統一以整數毫秒為準，秒數四捨五入（.5 一律進位）換算，
+同一時間點不論從秒或毫秒傳入，輸出都完全相同。
+
+批次格式化以查表組字串："HH:"、"MM:SS"（3600 項）、",mmm"（1000 項），
+每個時間戳記只需三次查表與串接
+"""
+
+import math
+from array import array
+
+_hours_table = []
+_minutes_table = [f"{m:02d}:{s:02d}" for m in range(60) for s in range(60)]
+_millis_tables = {}
+
+
+def seconds_to_ms(seconds):
+    """
+    秒 → 整數毫秒（四捨五入，.5 進位；round() 是銀行家捨入，2.5 ms 會變成 2）
+    供應商回傳的秒數最多三位小數，浮點誤差遠小於 0.5 ms
+    """
+    return math.floor(seconds * 1000 + 0.5)
+
+
+def _round_ms(value):
+    """毫秒 → 整數毫秒，捨入規則與 seconds_to_ms 相同"""
+    return value if isinstance(value, int) else math.floor(value + 0.5)
+
+
+def to_ms_array(values, unit="ms"):
+    """把秒或毫秒的序列轉成 array('q') 整數毫秒"""
+    if unit == "ms":
+        return array("q", map(_round_ms, values))
+    if unit == "s":
+        return array("q", map(seconds_to_ms, values))
+    raise ValueError(f"不支援的時間單位: {unit}")
+
+
+def _hour_table(limit):
+    """HH: 前綴查表，依需要延長（超過 99 小時自動加寬）"""
+    table = _hours_table
+    for hour in range(len(table), limit):
+        table.append(f"{hour:02d}:")
+    return table
+
+
+def _millis_table(separator):
+    table = _millis_tables.get(separator)
+    if table is None:
+        table = _millis_tables[separator] = [f"{separator}{ms:03d}" for ms in range(1000)]
+    return table
+
+
+def format_timestamps(values, separator=",", unit="ms"):
+    """
+    批次格式化：回傳 "HH:MM:SS,mmm" 字串清單（WebVTT 用 separator="."）
+    values 為整數毫秒（unit="ms"）或秒（unit="s"）的序列；負值以 0 計
+    """
+    if not (unit == "ms" and isinstance(values, array) and values.typecode in "bhilqBHILQ"):
+        values = to_ms_array(values, unit)
+    if not values:
+        return []
+    # 負值以 0 計，查表大小也不能由負值決定（全為負值時 max 會是負數）
+    hours = _hour_table(max(max(values), 0) // 3_600_000 + 1)
+    minutes = _minutes_table
+    millis = _millis_table(separator)
+    result = []
+    append = result.append
+    for ms in values:
+        if ms < 0:
+            ms = 0
+        seconds, ms = divmod(ms, 1000)
+        hour, seconds = divmod(seconds, 3600)
+        append(hours[hour] + minutes[seconds] + millis[ms])
+    return result
+
+
+def format_timestamp(value, separator=",", unit="ms"):
+    """單一時間戳記，與 format_timestamps 輸出相同"""
+    ms = seconds_to_ms(value) if unit == "s" else _round_ms(value)
+    seconds, millis = divmod(max(ms, 0), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+
+def format_srt_time(seconds):
+    """與舊腳本相同的呼叫方式（秒），修正毫秒截斷誤差"""
+    return format_timestamp(seconds, unit="s")
+
+
+def format_srt_time_ms(milliseconds):
+    """test_assemblyai_multispeaker_final 等收毫秒的版本"""
+    return format_timestamp(milliseconds)
+
+
+def format_ass_timestamps(values):
+    """批次格式化 ASS 時間 H:MM:SS.cc（百分之一秒，四捨五入）"""
+    centis_table = _millis_tables.get("ass")
+    if centis_table is None:
+        centis_table = _millis_tables["ass"] = [f".{cs:02d}" for cs in range(100)]
+    minutes = _minutes_table
+    result = []
+    append = result.append
+    for ms in values:
+        seconds, centis = divmod((max(int(ms), 0) + 5) // 10, 100)
+        hour, seconds = divmod(seconds, 3600)
+        append(f"{hour:d}:" + minutes[seconds] + centis_table[centis])
+    return result
+
+
+def cue_timings(cues, separator=","):
+    """一次格式化所有 Cue 的 "start --> end" 時間行"""
+    values = array("q")
+    for cue in cues:
+        values.append(cue.start)
+        values.append(cue.end)
+    stamps = format_timestamps(values, separator)
+    return [f"{stamps[i]} --> {stamps[i + 1]}" for i in range(0, len(stamps), 2)]
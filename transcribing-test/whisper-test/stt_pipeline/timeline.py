@@ -0,0 +1,264 @@
+"""
+跨供應商統一的詞彙時間軸
+所有詞彙存在連續陣列中：整數毫秒的起訖時間、指向單一字串緩衝區的文字位移、
+說話者代碼、類型（word / spacing / audio_event）與信心度。
+各供應商的 JSON 由 from_elevenlabs / from_assemblyai / from_openai 轉換，
+後續的分段、評分都直接在陣列上運算，不再各自判斷供應商格式
+"""
+
+import math
+from array import array
+
+from .cues import AudioEvent, event_label
+
+KIND_WORD = 0
+KIND_SPACING = 1
+KIND_AUDIO_EVENT = 2
+
+KIND_NAMES = {"word": KIND_WORD, "spacing": KIND_SPACING, "audio_event": KIND_AUDIO_EVENT}
+
+NO_SPEAKER = -1
+
+
+def _is_cjk(char):
+    """中日韓文字與全形標點不需要以空白分詞"""
+    code = ord(char)
+    return (
+        0x2E80 <= code <= 0x9FFF
+        or 0xAC00 <= code <= 0xD7AF
+        or 0xF900 <= code <= 0xFAFF
+        or 0xFF00 <= code <= 0xFFEF
+        or 0x3000 <= code <= 0x303F
+    )
+
+
+def _needs_space(previous_text, text):
+    """兩個詞之間是否需要補空白（以空白分詞的語言）"""
+    if not previous_text or not text:
+        return False
+    if previous_text[-1].isspace() or text[0].isspace():
+        return False
+    return not (_is_cjk(previous_text[-1]) or _is_cjk(text[0]))
+
+
+def _get(item, key, default=None):
+    """同時支援 dict 與 OpenAI SDK 物件"""
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
+
+
+def _confidence(item):
+    """詞彙信心度；缺欄位或為 null（AssemblyAI 偶爾回傳）時為 NaN"""
+    value = _get(item, "confidence")
+    return math.nan if value is None else float(value)
+
+
+class WordTimeline:
+    """
+    以陣列儲存的詞彙時間軸
+
+    第 i 個項目：
+    - 文字 buffer[offsets[i]:offsets[i + 1]]
+    - 時間 starts[i] ~ ends[i]（毫秒）
+    - kinds[i]、speakers[i]（speaker_names 的索引，-1 代表無）、confidence[i]（未知為 NaN）
+
+    連續項目 i..j-1 的文字就是 buffer[offsets[i]:offsets[j]]，組成字幕不需要逐詞串接字串
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.offsets = array("l", [0])
+        self.starts = array("l")
+        self.ends = array("l")
+        self.kinds = array("b")
+        self.speakers = array("h")
+        self.confidence = array("d")
+        self.speaker_names = []
+        self._parts = []
+        self._length = 0
+        self._speaker_codes = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, text, start_ms, end_ms, kind=KIND_WORD, speaker=None, confidence=math.nan):
+        """加入一個項目；建構完成後呼叫 finalize()"""
+        self._parts.append(text)
+        self._length += len(text)
+        self.offsets.append(self._length)
+        self.starts.append(start_ms)
+        self.ends.append(max(end_ms, start_ms))
+        self.kinds.append(kind)
+        self.speakers.append(self.speaker_code(speaker))
+        self.confidence.append(confidence)
+
+    def speaker_code(self, speaker):
+        if speaker is None:
+            return NO_SPEAKER
+        code = self._speaker_codes.get(speaker)
+        if code is None:
+            code = len(self.speaker_names)
+            self._speaker_codes[speaker] = code
+            self.speaker_names.append(speaker)
+        return code
+
+    def finalize(self):
+        """把暫存的文字片段合併成單一緩衝區"""
+        if self._parts:
+            self.buffer += "".join(self._parts)
+            self._parts = []
+        return self
+
+    def text(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]]
+
+    def span_text(self, i, j):
+        """項目 i..j-1 的連續文字"""
+        return self.buffer[self.offsets[i]:self.offsets[j]]
+
+    def speaker(self, i):
+        code = self.speakers[i]
+        return None if code == NO_SPEAKER else self.speaker_names[code]
+
+    def indices(self, kind=KIND_WORD):
+        """某一類型項目的索引陣列"""
+        kinds = self.kinds
+        return array("l", (i for i in range(len(kinds)) if kinds[i] == kind))
+
+    def to_words(self):
+        """轉回 dict 清單（秒），方便與舊腳本互通"""
+        kind_names = {v: k for k, v in KIND_NAMES.items()}
+        return [
+            {
+                "text": self.text(i),
+                "start": self.starts[i] / 1000,
+                "end": self.ends[i] / 1000,
+                "type": kind_names[self.kinds[i]],
+                "speaker": self.speaker(i),
+                "confidence": None if math.isnan(self.confidence[i]) else self.confidence[i],
+            }
+            for i in range(len(self))
+        ]
+
+
+def _elevenlabs_items(word, previous_text):
+    """ElevenLabs Scribe：秒為單位，含 spacing / audio_event，speaker_id 與 logprob"""
+    logprob = word.get("logprob")
+    yield (
+        word.get("text", ""),
+        round(word.get("start", 0) * 1000),
+        round(word.get("end", 0) * 1000),
+        KIND_NAMES.get(word.get("type", "word"), KIND_WORD),
+        word.get("speaker_id"),
+        math.exp(logprob) if logprob is not None else math.nan,
+    )
+
+
+def _assemblyai_items(word, previous_text):
+    """AssemblyAI：毫秒為單位，speaker 為 A / B…，詞之間沒有 spacing 項目"""
+    text = _get(word, "text", "")
+    start = int(_get(word, "start", 0))
+    if _needs_space(previous_text, text):
+        yield (" ", start, start, KIND_SPACING, None, math.nan)
+    yield (text, start, int(_get(word, "end", 0)), KIND_WORD, _get(word, "speaker"), _confidence(word))
+
+
+def _openai_items(word, previous_text):
+    """OpenAI / Groq：秒為單位，詞彙欄位是 word（Groq 部分回應為 text）"""
+    text = _get(word, "word")
+    if text is None:
+        text = _get(word, "text", "")
+    start = round(_get(word, "start", 0) * 1000)
+    # Whisper 的詞常帶前導空白，拆成 spacing 項目
+    stripped = text.lstrip()
+    if stripped != text and previous_text:
+        yield (text[:len(text) - len(stripped)], start, start, KIND_SPACING, None, math.nan)
+    elif _needs_space(previous_text, stripped):
+        yield (" ", start, start, KIND_SPACING, None, math.nan)
+    if stripped:
+        yield (stripped, start, round(_get(word, "end", 0) * 1000), KIND_WORD, None, math.nan)
+
+
+# 單一詞 → 時間軸項目；整份轉換（from_*）與串流斷句（stream.py）共用
+WORD_ADAPTERS = {
+    "elevenlabs": _elevenlabs_items,
+    "assemblyai": _assemblyai_items,
+    "openai": _openai_items,
+    "groq": _openai_items,
+}
+
+
+def iter_items(provider, words, event_track=None):
+    """
+    逐詞產生 (text, start_ms, end_ms, kind, speaker, confidence)，即 WordTimeline.append 的參數；
+    words 可以是仍在產生中的 iterator。
+    傳入 event_track（list）時，audio_event 改放進 event_track（AudioEvent），不產生項目
+    """
+    try:
+        adapter = WORD_ADAPTERS[provider]
+    except KeyError:
+        raise ValueError(f"不支援的供應商: {provider}") from None
+    previous_text = ""
+    for word in words:
+        for item in adapter(word, previous_text):
+            kind = item[3]
+            if kind == KIND_AUDIO_EVENT and event_track is not None:
+                text, start, end, _, speaker, _ = item
+                event_track.append(AudioEvent(start, max(end, start), text, speaker, event_label(text)))
+                continue
+            yield item
+            if kind == KIND_WORD:
+                previous_text = item[0]
+
+
+def _from_items(provider, result, event_track=None):
+    timeline = WordTimeline()
+    append = timeline.append
+    for item in iter_items(provider, _get(result, "words") or [], event_track):
+        append(*item)
+    return timeline.finalize()
+
+
+def from_elevenlabs(result, event_track=None):
+    """
+    ElevenLabs Scribe
+    傳入 event_track（list）時，audio_event 在同一次走訪中改放進 event_track（AudioEvent），
+    不進入時間軸，字幕文字就不會混入「[笑聲]」之類的事件描述
+    """
+    return _from_items("elevenlabs", result, event_track)
+
+
+def from_assemblyai(result):
+    """AssemblyAI：毫秒為單位，speaker 為 A / B…，詞之間沒有 spacing 項目"""
+    return _from_items("assemblyai", result)
+
+
+def from_openai(result):
+    """
+    OpenAI / Groq verbose_json：秒為單位，詞彙欄位是 word（Groq 部分回應為 text），
+    result 可以是 dict 或 SDK 回傳的物件
+    """
+    return _from_items("openai", result)
+
+
+ADAPTERS = {
+    "elevenlabs": from_elevenlabs,
+    "assemblyai": from_assemblyai,
+    "openai": from_openai,
+    "groq": from_openai,
+}
+
+
+def from_provider(provider, result, event_track=None):
+    """
+    依供應商名稱轉換成 WordTimeline
+    event_track 只對有音效事件的供應商（ElevenLabs）有作用，其他供應商不會加入任何項目
+    """
+    try:
+        adapter = ADAPTERS[provider]
+    except KeyError:
+        raise ValueError(f"不支援的供應商: {provider}") from None
+    if provider == "elevenlabs":
+        return adapter(result, event_track)
+    return adapter(result)
@@ -0,0 +1,220 @@
+"""
+跨供應商詞彙時間對齊
+create_complete_comparison 只比較字幕段落長度，沒有比較時間準不準。
+這裡把兩個供應商的 WordTimeline 對齊到同一個詞，量測起訖時間差：
+
+1. 兩邊詞彙文字正規化（繁簡、全形半形，忽略標點與空白）後以 accuracy.align 逐字對齊
+   （唯一 k-gram 錨點 + 區段 DP，接近線性時間）
+2. 文字相同的連續字元，在兩邊詞界同時結束處切成一組（「美國」對「美」「国」也能配對）
+3. 文字不同的區段（轉錄錯字）改以時間區間重疊一對一配對
+4. 時間差與前後配對的局部中位數相差超過 max_delta_ms 的配對視為錨點錯置，不列入統計
+   （以局部中位數為準，長時間累積的漂移不會被誤判）
+
+回報每個詞的起訖差、系統性偏移（中位數）與漂移（時間差對時間的線性迴歸斜率）
+"""
+
+import statistics
+from array import array
+from collections import namedtuple
+from dataclasses import dataclass, field
+
+from .accuracy import align
+from .textnorm import normalize_with_offsets
+from .timeline import KIND_WORD, from_provider
+
+DEFAULT_MAX_DELTA_MS = 1500
+OUTLIER_WINDOW = 15       # 局部中位數取前後各 15 個配對
+DEFAULT_MIN_OVERLAP = 0.5
+DEFAULT_LAG_MS = 200     # 字幕晚於畫面超過約 0.2 秒就看得出來
+
+# a_first..a_last、b_first..b_last 為兩邊時間軸的項目索引；delta = other - reference（毫秒）
+WordMatch = namedtuple("WordMatch", [
+    "a_first", "a_last", "b_first", "b_last", "text", "time_ms", "start_delta", "end_delta", "method",
+])
+
+
+def _word_chars(timeline):
+    """詞彙文字正規化後的字串，以及每個字元所屬的項目索引"""
+    normalized, offsets = normalize_with_offsets(timeline.buffer, ignore_punctuation=True,
+                                                 ignore_whitespace=True)
+    owner_of = array("l", [-1]) * len(timeline.buffer)
+    bounds, kinds = timeline.offsets, timeline.kinds
+    for i in range(len(timeline)):
+        if kinds[i] == KIND_WORD:
+            owner_of[bounds[i]:bounds[i + 1]] = array("l", [i]) * (bounds[i + 1] - bounds[i])
+    chars = []
+    owners = array("l")
+    for char, offset in zip(normalized, offsets):
+        owner = owner_of[offset]
+        if owner >= 0:
+            chars.append(char)
+            owners.append(owner)
+    return "".join(chars), owners
+
+
+@dataclass
+class TimingReport:
+    """兩份時間軸的對齊結果；delta 一律為 other - reference，正值代表 other 較晚"""
+    reference_words: int
+    other_words: int
+    matches: list = field(default_factory=list)
+    rejected: int = 0
+
+    @property
+    def coverage(self):
+        matched = sum(match.a_last - match.a_first + 1 for match in self.matches)
+        return min(matched / self.reference_words, 1.0) if self.reference_words else 0.0
+
+    def _deltas(self, name):
+        return [getattr(match, name) for match in self.matches]
+
+    @property
+    def start_offset_ms(self):
+        """系統性起始偏移：起始時間差的中位數"""
+        deltas = self._deltas("start_delta")
+        return statistics.median(deltas) if deltas else 0.0
+
+    @property
+    def end_offset_ms(self):
+        deltas = self._deltas("end_delta")
+        return statistics.median(deltas) if deltas else 0.0
+
+    def drift(self):
+        """
+        起始時間差對參考時間的最小平方迴歸：回傳 (每分鐘漂移毫秒, 截距毫秒)
+        斜率不為零代表兩邊時鐘速度不同，越往後差越多
+        """
+        if len(self.matches) < 2:
+            return 0.0, self.start_offset_ms
+        times = self._deltas("time_ms")
+        if min(times) == max(times):
+            return 0.0, self.start_offset_ms
+        slope, intercept = statistics.linear_regression(times, self._deltas("start_delta"))
+        return slope * 60_000, intercept
+
+    def absolute_error(self, q=0.5, name="start_delta"):
+        """|時間差| 的百分位數（q=0.5 為中位數）"""
+        values = sorted(abs(value) for value in self._deltas(name))
+        if not values:
+            return 0.0
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+    def lag_ratio(self, threshold_ms=DEFAULT_LAG_MS):
+        """起始時間比參考晚超過 threshold_ms 的詞比例（字幕看起來慢半拍）"""
+        if not self.matches:
+            return 0.0
+        return sum(1 for match in self.matches if match.start_delta > threshold_ms) / len(self.matches)
+
+    def to_dict(self):
+        drift, intercept = self.drift()
+        return {
+            "matched": len(self.matches),
+            "rejected": self.rejected,
+            "coverage": round(self.coverage, 4),
+            "start_offset_ms": self.start_offset_ms,
+            "end_offset_ms": self.end_offset_ms,
+            "median_abs_start_ms": self.absolute_error(0.5),
+            "p90_abs_start_ms": self.absolute_error(0.9),
+            "median_abs_end_ms": self.absolute_error(0.5, "end_delta"),
+            "drift_ms_per_min": round(drift, 2),
+            "intercept_ms": round(intercept, 1),
+            "lag_ratio": round(self.lag_ratio(), 4),
+        }
+
+
+def _words_within(owners, lo, hi):
+    """字元區段 lo..hi-1 內完整包含的詞（跨出區段邊界的詞不算）"""
+    outside = {owners[lo - 1] if lo else -1, owners[hi] if hi < len(owners) else -1}
+    words = []
+    for word in owners[lo:hi]:
+        if word not in outside and (not words or words[-1] != word):
+            words.append(word)
+    return words
+
+
+def _overlap_pairs(reference, other, a_words, b_words, min_overlap):
+    """文字不同的區段：依時間順序雙指標走訪，重疊比例足夠的詞一對一配對"""
+    pairs = []
+    x = y = 0
+    while x < len(a_words) and y < len(b_words):
+        i, j = a_words[x], b_words[y]
+        a_start, a_end = reference.starts[i], reference.ends[i]
+        b_start, b_end = other.starts[j], other.ends[j]
+        shortest = max(min(a_end - a_start, b_end - b_start), 1)
+        if min(a_end, b_end) - max(a_start, b_start) >= min_overlap * shortest:
+            pairs.append((i, j))
+            x += 1
+            y += 1
+        elif a_end <= b_end:
+            x += 1
+        else:
+            y += 1
+    return pairs
+
+
+def _reject_outliers(matches, max_delta_ms, window=OUTLIER_WINDOW):
+    """起始時間差與前後 window 個配對的中位數相差超過 max_delta_ms 者剔除"""
+    deltas = [match.start_delta for match in matches]
+    kept = []
+    for index, match in enumerate(matches):
+        local = statistics.median(deltas[max(index - window, 0):index + window + 1])
+        if abs(match.start_delta - local) <= max_delta_ms:
+            kept.append(match)
+    return kept
+
+
+def align_timings(reference, other, max_delta_ms=DEFAULT_MAX_DELTA_MS, min_overlap=DEFAULT_MIN_OVERLAP):
+    """對齊兩份 WordTimeline 的詞彙並量測時間差"""
+    a_chars, a_owner = _word_chars(reference)
+    b_chars, b_owner = _word_chars(other)
+    report = TimingReport(
+        reference_words=len(set(a_owner)),
+        other_words=len(set(b_owner)),
+    )
+    candidates = []
+
+    def add(a_first, a_last, b_first, b_last, method):
+        start_delta = other.starts[b_first] - reference.starts[a_first]
+        end_delta = other.ends[b_last] - reference.ends[a_last]
+        text = reference.span_text(a_first, a_last + 1)
+        candidates.append(WordMatch(a_first, a_last, b_first, b_last, text,
+                                    reference.starts[a_first], start_delta, end_delta, method))
+
+    a_count, b_count = len(a_chars), len(b_chars)
+    for tag, i1, i2, j1, j2 in align(a_chars, b_chars):
+        if tag == "equal":
+            group = None
+            for p, q in zip(range(i1, i2), range(j1, j2)):
+                wa, wb = a_owner[p], b_owner[q]
+                if group is None:
+                    # 組的開頭必須同時是兩邊詞的第一個字
+                    if (p and a_owner[p - 1] == wa) or (q and b_owner[q - 1] == wb):
+                        continue
+                    group = (wa, wb)
+                a_ends = p + 1 == a_count or a_owner[p + 1] != wa
+                b_ends = q + 1 == b_count or b_owner[q + 1] != wb
+                if a_ends and b_ends:
+                    add(group[0], wa, group[1], wb, "text")
+                    group = None
+        elif tag == "replace":
+            a_words = _words_within(a_owner, i1, i2)
+            b_words = _words_within(b_owner, j1, j2)
+            for i, j in _overlap_pairs(reference, other, a_words, b_words, min_overlap):
+                add(i, i, j, j, "overlap")
+
+    report.matches = _reject_outliers(candidates, max_delta_ms)
+    report.rejected = len(candidates) - len(report.matches)
+    return report
+
+
+def compare_timings(results, reference, **options):
+    """
+    results 為 {名稱: (provider, result)}，以 reference 指定的一份為基準，
+    回傳其他每一份的 TimingReport
+    """
+    timelines = {name: from_provider(provider, result) for name, (provider, result) in results.items()}
+    base = timelines[reference]
+    return {
+        name: align_timings(base, timeline, **options)
+        for name, timeline in timelines.items() if name != reference
+    }
@@ -0,0 +1,136 @@
+"""
+AssemblyAI 串流上傳與去重
+以內容 SHA-256 記錄已上傳的 upload_url（含有效期限），
+相同音檔在重跑或其他腳本中直接沿用，不再重新上傳
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+# AssemblyAI 上傳的檔案不保證永久保留，保守以 24 小時為限
+DEFAULT_TTL = 24 * 3600
+
+DEFAULT_REGISTRY_PATH = ".assemblyai_uploads.json"
+
+
+def _key_fingerprint(api_key):
+    """upload_url 只對上傳的帳號有效；登記時只保存金鑰雜湊"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def hash_audio(audio, chunk_size=CHUNK_SIZE):
+    """分塊計算音檔 SHA-256；audio 為路徑或 bytes"""
+    digest = hashlib.sha256()
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        digest.update(audio)
+    else:
+        with open(audio, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def iter_chunks(audio, chunk_size=CHUNK_SIZE):
+    """以固定大小分塊產生上傳內容，檔案不需整個載入記憶體"""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        view = memoryview(audio)
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset:offset + chunk_size])
+        return
+
+    with open(audio, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class UploadRegistry:
+    """
+    內容雜湊 → upload_url 的持久化對照表
+    以 JSON 檔保存，寫入時先寫暫存檔再取代，避免多個腳本同時寫入時檔案損毀
+    """
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH, ttl=DEFAULT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, entries):
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def get(self, key):
+        """回傳尚未過期的 upload_url，否則 None"""
+        entry = self._load().get(key)
+        if entry and time.time() - entry["uploaded_at"] < self.ttl:
+            return entry["upload_url"]
+        return None
+
+    def put(self, key, upload_url):
+        """登記 upload_url，順便清掉已過期的項目"""
+        now = time.time()
+        entries = {
+            k: v for k, v in self._load().items()
+            if now - v["uploaded_at"] < self.ttl
+        }
+        entries[key] = {"upload_url": upload_url, "uploaded_at": now}
+        self._save(entries)
+
+
+class AssemblyAIUploader:
+    """
+    串流上傳器
+    - 以 chunked transfer 串流上傳，不把整個檔案讀進記憶體
+    - 先查 UploadRegistry，命中就直接回傳既有 upload_url
+    - 同一行程內同時上傳相同內容時只送出一次
+    """
+
+    def __init__(self, engine, registry=None, chunk_size=CHUNK_SIZE):
+        self.engine = engine
+        self.registry = registry if registry is not None else UploadRegistry()
+        self.chunk_size = chunk_size
+        self._inflight = {}
+
+    async def upload(self, audio, api_key=None):
+        """上傳音檔（路徑或 bytes），回傳 upload_url；api_key 預設為第一把金鑰"""
+        api_key = api_key or self.engine.api_key("assemblyai")
+        digest = await asyncio.to_thread(hash_audio, audio, self.chunk_size)
+        key = f"{_key_fingerprint(api_key)}:{digest}"
+
+        upload_url = self.registry.get(key)
+        if upload_url:
+            return upload_url
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._upload(audio, api_key, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _upload(self, audio, api_key, key):
+        url = f"{self.engine.base_url('assemblyai')}/v2/upload"
+        headers = {"authorization": api_key}
+        response = await self.engine.request(
+            "assemblyai", "POST", url,
+            headers=headers, content=iter_chunks(audio, self.chunk_size),
+        )
+        upload_url = response.json()["upload_url"]
+        self.registry.put(key, upload_url)
+        return upload_url
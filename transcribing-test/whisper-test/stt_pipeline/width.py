@@ -0,0 +1,75 @@
+"""
+字幕顯示寬度
+與 n8n_code_node_fixed.js 的 calculateDisplayWidth 相同概念：中文、全形字元寬度 2，英數寬度 1。
+寬度表依 Unicode East Asian Width 預先算好一次（BMP 內查表），
+並提供時間軸的寬度前綴和，任一連續區段的寬度都是 O(1)
+"""
+
+import unicodedata
+from array import array
+from itertools import accumulate
+
+BMP_SIZE = 0x10000
+
+
+def _codepoint_width(code):
+    char = chr(code)
+    if unicodedata.combining(char) or unicodedata.category(char) in ("Mn", "Me", "Cf"):
+        return 0
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 2
+    return 1
+
+
+# calculateDisplayWidth 視為寬度 2 的區段，查表結果與它保持一致
+N8N_WIDE_RANGES = [
+    (0x4E00, 0x9FFF),   # CJK 統一表意文字
+    (0x3400, 0x4DBF),   # CJK 擴展 A
+    (0xF900, 0xFAFF),   # CJK 兼容表意文字
+    (0x3000, 0x303F),   # CJK 符號和標點
+    (0xFF00, 0xFFEF),   # 全形字元
+]
+
+
+def _build_table():
+    table = bytearray(_codepoint_width(code) for code in range(BMP_SIZE))
+    for low, high in N8N_WIDE_RANGES:
+        table[low:high + 1] = b"\x02" * (high - low + 1)
+    return bytes(table)
+
+
+_table = None
+
+
+def width_table():
+    """BMP 寬度表（bytes，索引為碼位），第一次使用時建立"""
+    global _table
+    if _table is None:
+        _table = _build_table()
+    return _table
+
+
+def char_width(char):
+    code = ord(char)
+    if code < BMP_SIZE:
+        return width_table()[code]
+    # BMP 以外主要是 CJK 擴展與表情符號，皆為寬字元
+    return 2 if 0x1F300 <= code <= 0x1FAFF or 0x20000 <= code <= 0x3FFFF else 1
+
+
+def display_width(text):
+    """字串的顯示寬度；純 ASCII 直接回傳長度"""
+    if text.isascii():
+        return len(text)
+    table = width_table()
+    return sum(table[code] if code < BMP_SIZE else char_width(chr(code)) for code in map(ord, text))
+
+
+def width_prefix(timeline):
+    """
+    時間軸的寬度前綴和：prefix[i] 為項目 0..i-1 的總寬度，
+    項目 i..j-1 的寬度為 prefix[j] - prefix[i]
+    """
+    buffer, offsets = timeline.buffer, timeline.offsets
+    widths = (display_width(buffer[offsets[i]:offsets[i + 1]]) for i in range(len(timeline)))
+    return array("l", accumulate(widths, initial=0))